@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from restaurant.static_files import StaticFilesASGI
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'littlelemon.settings')
 
-application = get_asgi_application()
+# Serves STATIC_URL before Django sees the request.
+application = StaticFilesASGI(get_asgi_application())
@@ -57,8 +57,9 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         # The settings for templates updated for the Graded assessment
-        'DIRS': ['restaurant/templates' ],
-        'APP_DIRS': True,
+        # One absolute directory is probed first; the app directories loader
+        # is kept only so the admin templates still resolve.
+        'DIRS': [BASE_DIR / 'restaurant' / 'templates'],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -66,6 +67,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory, so the base.html and
+            # partials includes are only looked up and parsed once.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -87,6 +96,41 @@ DATABASES = {
     }
 }
 
+# Idempotency-Key handling for POSTs to the bookings view
+# (restaurant/idempotency.py).
+IDEMPOTENCY = {
+    # DatabaseStore or CacheStore; the cache store needs a cache shared by
+    # all workers.
+    'STORE': 'restaurant.idempotency.DatabaseStore',
+    # Seconds a response is replayed for.
+    'TTL': 24 * 60 * 60,
+    # Seconds before the lock of a request that never finished expires.
+    'LOCK_TIMEOUT': 30,
+    # Seconds a duplicate waits for the first request before a 409.
+    'WAIT': 5,
+}
+
+# Lists of reservations POSTed to the bookings view: the largest body
+# accepted, in bytes, and the most reservations per request.
+BOOKINGS_BATCH = {
+    'MAX_BODY': 64 * 1024,
+    'MAX_ITEMS': 50,
+}
+
+# Seconds a month of slot availability (restaurant/availability.py) stays
+# cached. Booking writes drop the month as they commit, in the worker that
+# made them; other workers see it after this TTL unless the cache is shared.
+AVAILABILITY_CACHE_TTL = 300
+
+# Sessions are stored in the database. Once CACHES has a cache shared by all
+# workers (SESSION_CACHE_ALIAS), set SESSION_ENGINE = 'restaurant.sessions':
+# sessions are then read through the cache, unchanged sessions are not
+# written back, and changes reach the database at most every
+# SESSION_FLUSH_INTERVAL seconds. It refuses to start on the default
+# per-process cache.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_FLUSH_INTERVAL = 30
+
 # The settings for media files have been updated for the Graded assessment
 MEDIA_URL = '/media/'
 
@@ -129,8 +173,38 @@ STATIC_URL = 'restaurant/static/'
 
 STATICFILES_DIRS = [
     "restaurant/static",
+    # The shared "Static routes assets" bundle at the root of the repository,
+    # under STATIC_URL + 'routes/': its css/style.css differs from ours.
+    ('routes', BASE_DIR.parent / 'Static routes assets' / 'static'),
 ]
 
+# `manage.py collectstatic` copies the files here with their content hash in
+# their names (ManifestStaticFilesStorage), for the templates' {% static %}.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+    },
+}
+
+# Static files served from STATIC_ROOT by the app workers themselves
+# (restaurant/static_files.py, wrapped around the WSGI and ASGI apps).
+STATIC_SERVE = {
+    # With DEBUG, runserver serves them from STATICFILES_DIRS instead.
+    'ENABLED': not DEBUG,
+    # Cache-Control max-age, in seconds, of files without a hashed name;
+    # hashed names are cached for a year as immutable.
+    'MAX_AGE': 60,
+    # Files up to MEMORY_FILE_MAX bytes are kept in memory, CACHE_BYTES in
+    # all per worker; larger ones are sent from disk with sendfile.
+    'MEMORY_FILE_MAX': 256 * 1024,
+    'CACHE_BYTES': 32 * 1024 * 1024,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
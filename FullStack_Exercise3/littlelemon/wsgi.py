@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from restaurant.static_files import StaticFilesWSGI
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'littlelemon.settings')
 
-application = get_wsgi_application()
+# Serves STATIC_URL before Django sees the request.
+application = StaticFilesWSGI(get_wsgi_application())
@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+
+# Templates rendered by the restaurant views.
+PAGE_TEMPLATES = [
+    'index.html',
+    'about.html',
+    'menu.html',
+    'menu_item.html',
+    'book.html',
+    'bookings.html',
+]
 
 
 class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurant'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Compile the page templates into the cached loader at startup so the
+        # first request to each page doesn't pay for parsing them.
+        if not settings.DEBUG:
+            precompile_templates()
+
+
+def precompile_templates():
+    from django.template.loader import get_template
+
+    for name in PAGE_TEMPLATES:
+        get_template(name)
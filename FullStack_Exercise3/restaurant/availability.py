@@ -0,0 +1,79 @@
+"""
+Free and taken reservation slots over a range of dates.
+
+Taken slots are counted with one GROUP BY (date, slot) over Booking for all
+the months that aren't cached yet, and each month is cached on its own.
+Booking writes drop the months they touch (see restaurant/signals.py and
+the bulk_create in views.book_many).
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Booking
+
+# The slots book.html offers.
+SLOTS = list(range(11, 20))
+
+
+def month_key(year, month):
+    return f'restaurant:availability:{year}-{month:02d}'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def taken_slots(start, end):
+    """``{date: sorted taken slots}`` for the dates from ``start`` to ``end``, inclusive."""
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+
+    cached = cache.get_many([month_key(m.year, m.month) for m in months])
+    missing = [m for m in months if month_key(m.year, m.month) not in cached]
+    if missing:
+        counted = {month_key(m.year, m.month): defaultdict(list) for m in missing}
+        rows = (
+            Booking.objects
+            .filter(reservation_date__gte=missing[0], reservation_date__lt=next_month(missing[-1]))
+            .values('reservation_date', 'reservation_slot')
+            .annotate(bookings=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            day = row['reservation_date']
+            key = month_key(day.year, day.month)
+            # Months between two missing ones may be cached already.
+            if key in counted:
+                counted[key][day.isoformat()].append(row['reservation_slot'])
+        fresh = {key: {day: sorted(slots) for day, slots in days.items()} for key, days in counted.items()}
+        cache.set_many(fresh, settings.AVAILABILITY_CACHE_TTL)
+        cached.update(fresh)
+
+    taken = {}
+    day = start
+    while day <= end:
+        taken[day] = cached[month_key(day.year, day.month)].get(day.isoformat(), [])
+        day += timedelta(days=1)
+    return taken
+
+
+def invalidate(*days):
+    """Drop the cached months of ``days`` (dates or ISO strings; None is skipped)."""
+    months = set()
+    for day in days:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        if day is not None:
+            months.add(month_key(day.year, day.month))
+    cache.delete_many(months)
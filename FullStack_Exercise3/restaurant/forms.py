@@ -7,3 +7,10 @@ class BookingForm(ModelForm):
     class Meta:
         model = Booking
         fields = "__all__"
+
+
+class BookingRequestForm(BookingForm):
+    """BookingForm for the bookings endpoint, which checks taken slots itself."""
+
+    def validate_unique(self):
+        pass
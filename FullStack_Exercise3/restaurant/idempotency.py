@@ -0,0 +1 @@
+../../littlelemon/apps/restaurant/idempotency.py
\ No newline at end of file
@@ -0,0 +1,99 @@
+import tempfile
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+
+ENGINES = ['django.contrib.sessions.backends.db', 'restaurant.sessions']
+
+
+def session_view(request):
+    """Read the session on GET and change it on POST, as a form flow would."""
+    if request.method == 'POST':
+        request.session['last_slot'] = request.POST['slot']
+    return HttpResponse(request.session.get('last_slot', ''))
+
+
+# The benchmark serves its own view (ROOT_URLCONF is this module), so the
+# site's pages don't have to use the session to be measured.
+urlpatterns = [path('session/', session_view)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare session engines on a form flow (GET then POST of a view "
+        "that reads and changes the session, as a logged-in user) and on "
+        "repeated session saves. Sessions are cached in a temporary "
+        "file-based cache, shared like the cache the engine needs in "
+        "production. Everything written is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--iterations', type=int, default=200)
+        parser.add_argument('--engines', nargs='+', default=ENGINES)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(
+            f"{'engine':<40}{'flow ms/req':>12}{'session q/req':>14}"
+            f"{'same-save q':>12}{'new-save q':>12}  (n={iterations})"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            shared = override_settings(
+                CACHES={**settings.CACHES, settings.SESSION_CACHE_ALIAS: cache},
+                ROOT_URLCONF=__name__,
+            )
+            with shared:
+                for engine in options['engines']:
+                    self.run_engine(engine, iterations)
+
+    def run_engine(self, engine, iterations):
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        with override_settings(SESSION_ENGINE=engine), transaction.atomic():
+            flow_ms, flow_queries = self.form_flow(iterations)
+            same_queries, new_queries = self.saves(iterations)
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'{engine:<40}{flow_ms:>12.2f}{flow_queries:>14.2f}{same_queries:>12.2f}{new_queries:>12.2f}'
+        )
+
+    def form_flow(self, iterations):
+        client = Client()
+        client.force_login(User.objects.create_user('bench-sessions'))
+        client.get('/session/')
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            for n in range(iterations):
+                client.get('/session/')
+                client.post('/session/', {'slot': n % 12 + 10})
+        requests = iterations * 2
+        elapsed = time.perf_counter() - start
+        return elapsed / requests * 1000, self.session_queries(queries) / requests
+
+    def saves(self, iterations):
+        """Session queries per save when the data is unchanged, and when it changes."""
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        session = store_class()
+        session['cart'] = []
+        session.save()
+        results = []
+        for change in (False, True):
+            with CaptureQueriesContext(connection) as queries:
+                for n in range(iterations):
+                    session = store_class(session.session_key)
+                    session['cart'] = [n] if change else []
+                    session.save()
+            results.append(self.session_queries(queries) / iterations)
+        return results
+
+    def session_queries(self, queries):
+        return sum('django_session' in query['sql'] for query in queries)
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Engine, RequestContext, engines
+from django.test import RequestFactory
+
+from restaurant.forms import BookingForm
+from restaurant.models import Menu
+
+
+class Command(BaseCommand):
+    help = "Render the restaurant page templates N times and report microseconds per render."
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--iterations', type=int, default=1000)
+        parser.add_argument(
+            '--templates', nargs='+',
+            default=['index', 'menu', 'menu_item', 'book', 'bookings'],
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        request = RequestFactory().get('/')
+        configured = engines['django'].engine
+        # The same engine without the cached loader: every render finds and
+        # parses base.html and the partials again.
+        uncached = Engine(
+            dirs=configured.dirs,
+            context_processors=configured.context_processors,
+            loaders=[
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+            libraries=configured.libraries,
+        )
+
+        self.stdout.write(f"{'template':<18}{'cached':>12}{'uncached':>12}  (us/render, n={iterations})")
+        for name in options['templates']:
+            template_name = f'{name}.html'
+            context = self.sample_context(name)
+            cached_us = self.time_render(configured, template_name, request, context, iterations)
+            uncached_us = self.time_render(uncached, template_name, request, context, iterations)
+            self.stdout.write(f'{template_name:<18}{cached_us:>12.1f}{uncached_us:>12.1f}')
+
+    def time_render(self, engine, template_name, request, context, iterations):
+        # Warm up once so the cached loader is measured in its steady state.
+        engine.get_template(template_name).render(RequestContext(request, context))
+        start = time.perf_counter()
+        for _ in range(iterations):
+            engine.get_template(template_name).render(RequestContext(request, context))
+        return (time.perf_counter() - start) / iterations * 1_000_000
+
+    def sample_context(self, name):
+        # Unsaved model instances keep the database out of the measurement.
+        items = [
+            Menu(pk=pk, name=f'Item {pk}', price=10 + pk, menu_item_description='Lorem ipsum')
+            for pk in range(1, 13)
+        ]
+        if name == 'menu':
+            return {'menu': {'menu': items}}
+        if name == 'menu_item':
+            return {'menu_item': items[0]}
+        if name == 'book':
+            return {'form': BookingForm()}
+        if name == 'bookings':
+            return {'bookings': '[]'}
+        return {}
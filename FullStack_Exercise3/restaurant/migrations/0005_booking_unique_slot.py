@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='booking',
+            unique_together={('reservation_date', 'reservation_slot')},
+        ),
+    ]
@@ -7,6 +7,10 @@ class Booking(models.Model):
     reservation_date = models.DateField()
     reservation_slot = models.SmallIntegerField(default=10)
 
+    class Meta:
+        # One booking per slot, however many requests race for it.
+        unique_together = [('reservation_date', 'reservation_slot')]
+
     def __str__(self): 
         return self.first_name
 
@@ -18,4 +22,17 @@ class Menu(models.Model):
    menu_item_description = models.TextField(max_length=1000, default='') 
 
    def __str__(self):
-      return self.name
\ No newline at end of file
+      return self.name
+
+# Stored responses for the Idempotency-Key header, see restaurant/idempotency.py
+class IdempotencyKey(models.Model):
+   key = models.CharField(max_length=255, unique=True)
+   fingerprint = models.CharField(max_length=64, blank=True)
+   # Null while the first request with this key is still running.
+   status_code = models.PositiveSmallIntegerField(null=True)
+   content = models.BinaryField(default=b'')
+   content_type = models.CharField(max_length=255, blank=True)
+   expires_at = models.DateTimeField(db_index=True)
+
+   def __str__(self):
+      return self.key
@@ -0,0 +1 @@
+../../littlelemon/apps/restaurant/sessions.py
\ No newline at end of file
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import availability
+from .models import Booking
+
+
+@receiver(post_init, sender=Booking)
+def remember_date(sender, instance, **kwargs):
+    # A booking moved to another month also frees its old one.
+    instance._loaded_reservation_date = instance.__dict__.get('reservation_date')
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, using, **kwargs):
+    # Once the write commits: a month dropped before then could be cached
+    # again, without the write, by a concurrent availability request.
+    days = (instance.reservation_date, instance._loaded_reservation_date)
+    transaction.on_commit(lambda: availability.invalidate(*days), using=using)
+    instance._loaded_reservation_date = instance.reservation_date
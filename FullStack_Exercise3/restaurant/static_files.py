@@ -0,0 +1,307 @@
+"""
+Static files served by the application workers.
+
+StaticFilesWSGI and StaticFilesASGI wrap the Django application and answer
+requests under STATIC_URL from STATIC_ROOT themselves, before Django and
+its middleware see them:
+
+- Files with a content hash in their name (those in the manifest of
+  ManifestStaticFilesStorage) are sent with ``Cache-Control: immutable``
+  and a year's max-age, other files with STATIC_SERVE['MAX_AGE'].
+- Files up to STATIC_SERVE['MEMORY_FILE_MAX'] bytes are served from an LRU
+  cache of at most STATIC_SERVE['CACHE_BYTES'] bytes. Larger files go
+  through the server's ``wsgi.file_wrapper`` (sendfile under gunicorn and
+  uWSGI) or the ASGI ``http.response.zerocopysend`` extension.
+- ETag and Last-Modified revalidation (304) and single byte ranges (206,
+  416) are supported; a request for several ranges gets the whole file.
+
+Run `manage.py collectstatic` on each deploy. When STATIC_SERVE['ENABLED']
+is off, as it is with DEBUG, requests go straight to Django, and runserver
+serves the static files itself.
+"""
+import mimetypes
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.wsgi import get_path_info
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+Response = namedtuple('Response', 'status headers body')
+# The part of a file larger than MEMORY_FILE_MAX to send.
+FileRange = namedtuple('FileRange', 'path offset length size')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# Request headers the static files need.
+REQUEST_HEADERS = ('if-none-match', 'if-modified-since', 'range', 'if-range')
+
+
+class ContentCache:
+    """File contents, least recently used dropped first, ``capacity`` bytes in all."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            content = self.entries.get(key)
+            if content is not None:
+                self.entries.move_to_end(key)
+            return content
+
+    def set(self, key, content):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = content
+            self.size += len(content)
+            while self.size > self.capacity:
+                _, dropped = self.entries.popitem(last=False)
+                self.size -= len(dropped)
+
+
+class StaticFile:
+    def __init__(self, path, stat_result, cache_control):
+        self.path = path
+        self.size = stat_result.st_size
+        self.mtime_ns = stat_result.st_mtime_ns
+        self.etag = f'"{self.mtime_ns:x}-{self.size:x}"'
+        self.last_modified = http_date(stat_result.st_mtime)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        self.headers = [
+            ('Content-Type', content_type),
+            ('Cache-Control', cache_control),
+            ('ETag', self.etag),
+            ('Last-Modified', self.last_modified),
+            ('Accept-Ranges', 'bytes'),
+        ]
+
+
+class StaticFiles:
+    def __init__(self):
+        config = settings.STATIC_SERVE
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = str(settings.STATIC_ROOT)
+        # The hashed names of ManifestStaticFilesStorage never change content.
+        self.immutable = frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.max_age = config['MAX_AGE']
+        self.memory_file_max = config['MEMORY_FILE_MAX']
+        self.contents = ContentCache(config['CACHE_BYTES'])
+        # name -> StaticFile, replaced when the file changes on disk.
+        self.files = {}
+
+    def handles(self, path):
+        return path.startswith(self.prefix)
+
+    def lookup(self, name):
+        try:
+            path = safe_join(self.root, name)
+            stat_result = os.stat(path)
+        except (SuspiciousFileOperation, ValueError, OSError):
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        file = self.files.get(name)
+        if file is None or (file.mtime_ns, file.size) != (stat_result.st_mtime_ns, stat_result.st_size):
+            cache_control = IMMUTABLE if name in self.immutable else f'public, max-age={self.max_age}'
+            file = self.files[name] = StaticFile(path, stat_result, cache_control)
+        return file
+
+    def respond(self, method, path, request):
+        """
+        The Response to ``method`` ``path``, ``request`` holding the
+        REQUEST_HEADERS that were sent.
+        """
+        if method not in ('GET', 'HEAD'):
+            return Response('405 Method Not Allowed', [('Allow', 'GET, HEAD'), ('Content-Length', '0')], b'')
+        file = self.lookup(path[len(self.prefix):])
+        if file is None:
+            return Response('404 Not Found', [('Content-Type', 'text/plain'), ('Content-Length', '9')], b'Not Found')
+        if self.not_modified(file, request):
+            return Response('304 Not Modified', file.headers[1:], b'')
+
+        byte_range = self.byte_range(file, request)
+        if byte_range is False:
+            return Response(
+                '416 Range Not Satisfiable', [('Content-Range', f'bytes */{file.size}'), ('Content-Length', '0')], b'',
+            )
+        start, end = byte_range or (0, file.size - 1)
+        headers = file.headers + [('Content-Length', str(end - start + 1))]
+        status = '200 OK'
+        if byte_range:
+            status = '206 Partial Content'
+            headers.append(('Content-Range', f'bytes {start}-{end}/{file.size}'))
+
+        if method == 'HEAD':
+            body = b''
+        elif file.size <= self.memory_file_max:
+            content = self.content(file)
+            body = content[start:end + 1] if byte_range else content
+        else:
+            body = FileRange(file.path, start, end - start + 1, file.size)
+        return Response(status, headers, body)
+
+    def content(self, file):
+        key = (file.path, file.mtime_ns, file.size)
+        content = self.contents.get(key)
+        if content is None:
+            with open(file.path, 'rb') as f:
+                content = f.read()
+            self.contents.set(key, content)
+        return content
+
+    def not_modified(self, file, request):
+        if_none_match = request.get('if-none-match')
+        if if_none_match:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or file.etag in tags
+        since = parse_http_date_safe(request.get('if-modified-since') or '')
+        return since is not None and file.mtime_ns // 1_000_000_000 <= since
+
+    def byte_range(self, file, request):
+        """
+        The (first, last) byte asked for by the Range header, None to send
+        the whole file, or False if the range is past its end.
+        """
+        value = request.get('range')
+        if not value:
+            return None
+        if_range = request.get('if-range')
+        if if_range and if_range.strip() not in (file.etag, file.last_modified):
+            return None
+        match = RANGE.match(value.strip())
+        if match is None or match.group(1, 2) == ('', ''):
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), file.size - 1) if last else file.size - 1
+        else:
+            # The last n bytes; bytes=-0 asks for none.
+            start, end = (max(file.size - int(last), 0) if int(last) else file.size), file.size - 1
+        if start >= file.size:
+            return False
+        return start, end
+
+
+def read_range(f, length):
+    """Yield ``length`` bytes of ``f`` from its current position, in chunks."""
+    while length > 0:
+        chunk = f.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            return
+        length -= len(chunk)
+        yield chunk
+
+
+class FileIterable:
+    """A WSGI response body sending part of an open file."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.length = length
+
+    def __iter__(self):
+        return read_range(self.f, self.length)
+
+    def close(self):
+        self.f.close()
+
+
+def static_files():
+    if not settings.STATIC_SERVE['ENABLED'] or '//' in settings.STATIC_URL:
+        return None
+    return StaticFiles()
+
+
+class StaticFilesWSGI:
+    """WSGI middleware serving STATIC_URL (see the module docstring)."""
+
+    def __init__(self, application):
+        self.application = application
+        self.files = static_files()
+
+    def __call__(self, environ, start_response):
+        path = get_path_info(environ)
+        if self.files is None or not self.files.handles(path):
+            return self.application(environ, start_response)
+        request = {name: environ.get('HTTP_' + name.upper().replace('-', '_')) for name in REQUEST_HEADERS}
+        response = self.files.respond(environ['REQUEST_METHOD'], path, request)
+        body = response.body
+        if isinstance(body, FileRange):
+            f = open(body.path, 'rb')
+            if body.offset == 0 and body.length == body.size and 'wsgi.file_wrapper' in environ:
+                body = environ['wsgi.file_wrapper'](f, CHUNK_SIZE)
+            else:
+                f.seek(body.offset)
+                body = FileIterable(f, body.length)
+        else:
+            body = [body]
+        start_response(response.status, response.headers)
+        return body
+
+
+class StaticFilesASGI:
+    """ASGI middleware serving STATIC_URL (see the module docstring)."""
+
+    def __init__(self, application):
+        self.application = application
+        self.files = static_files()
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path', '')
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if scope['type'] != 'http' or self.files is None or not self.files.handles(path):
+            return await self.application(scope, receive, send)
+
+        request = {}
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').lower()
+            if name in REQUEST_HEADERS:
+                request[name] = value.decode('latin-1')
+        # Reads small files from disk on a cache miss.
+        response = await sync_to_async(self.files.respond, thread_sensitive=False)(scope['method'], path, request)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status[:3]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers],
+        })
+        body = response.body
+        if not isinstance(body, FileRange):
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        f = await sync_to_async(open, thread_sensitive=False)(body.path, 'rb')
+        try:
+            if 'http.response.zerocopysend' in scope.get('extensions', {}):
+                await send({
+                    'type': 'http.response.zerocopysend', 'file': f, 'offset': body.offset, 'count': body.length,
+                })
+                return
+            f.seek(body.offset)
+            chunks = read_range(f, body.length)
+            read = sync_to_async(next, thread_sensitive=False)
+            while (chunk := await read(chunks, None)) is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            f.close()
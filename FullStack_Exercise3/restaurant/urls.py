@@ -10,4 +10,5 @@ urlpatterns = [
     path('menu/', views.menu, name="menu"),
     path('menu_item/<int:pk>/', views.display_menu_item, name="menu_item"),  
     path('bookings', views.bookings, name='bookings'), 
+    path('availability', views.availability_view, name='availability'),
 ]
\ No newline at end of file
@@ -1,13 +1,19 @@
 # from django.http import HttpResponse
+from .idempotency import idempotent
+from . import availability
 from django.shortcuts import render
-from .forms import BookingForm
+from .forms import BookingForm, BookingRequestForm
 from .models import Menu
 from django.core import serializers
 from .models import Booking
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.dateparse import parse_date
+from functools import wraps
 
 
 # Create your views here.
@@ -46,23 +52,132 @@ def display_menu_item(request, pk=None):
         menu_item = "" 
     return render(request, 'menu_item.html', {"menu_item": menu_item}) 
 
+def limit_body(view):
+    """
+    Refuse POST bodies over BOOKINGS_BATCH['MAX_BODY'] from their
+    Content-Length, before anything reads them (Django never reads past it).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method == 'POST':
+            limit = settings.BOOKINGS_BATCH['MAX_BODY']
+            try:
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return JsonResponse({'error': 'Malformed Content-Length header.'}, status=400)
+            if length > limit:
+                return JsonResponse({'error': f'Request body is larger than {limit} bytes.'}, status=413)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
 @csrf_exempt
+@limit_body
+@idempotent
 def bookings(request):
     if request.method == 'POST':
-        data = json.load(request)
-        exist = Booking.objects.filter(reservation_date=data['reservation_date']).filter(
-            reservation_slot=data['reservation_slot']
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Request body is not valid JSON.'}, status=400)
+        if isinstance(data, list):
+            return book_many(data)
+        form = BookingRequestForm(data if isinstance(data, dict) else {})
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        exist = Booking.objects.filter(reservation_date=form.cleaned_data['reservation_date']).filter(
+            reservation_slot=form.cleaned_data['reservation_slot']
         ).exists()
         if exist == False:
-            booking = Booking(
-                first_name=data['first_name'],
-                reservation_date=data['reservation_date'],
-                reservation_slot=data['reservation_slot'],
-            )
-            booking.save()
-        else:
+            try:
+                with transaction.atomic():
+                    Booking.objects.create(**form.cleaned_data)
+            except IntegrityError:
+                # Another request took the slot since the check.
+                exist = True
+        if exist:
             return HttpResponse("{'error':1}", content_type="application/json")
     date = request.GET.get('date',datetime.today().date())
     bookings = Booking.objects.all().filter(reservation_date=date)
     booking_json = serializers.serialize('json', bookings)
-    return HttpResponse(booking_json, content_type="application/json")
\ No newline at end of file
+    return HttpResponse(booking_json, content_type="application/json")
+
+def book_many(items):
+    """
+    Book a list of reservations at once: one query finds the taken
+    (date, slot) pairs, one bulk_create inserts the free ones, and the
+    response has a result for each item, in order.
+    """
+    if len(items) > settings.BOOKINGS_BATCH['MAX_ITEMS']:
+        return JsonResponse(
+            {'error': f"At most {settings.BOOKINGS_BATCH['MAX_ITEMS']} reservations per request."}, status=400,
+        )
+    results = []
+    valid = []
+    for index, item in enumerate(items):
+        form = BookingRequestForm(item if isinstance(item, dict) else {})
+        if form.is_valid():
+            valid.append((index, form.cleaned_data))
+            results.append(None)
+        else:
+            results.append({'index': index, 'status': 'invalid', 'errors': form.errors.get_json_data()})
+
+    try:
+        with transaction.atomic():
+            # One query for every requested pair: dates IN (...) AND slots IN
+            # (...) may return a few extra rows, which the exact match skips.
+            taken = set(Booking.objects.filter(
+                reservation_date__in={data['reservation_date'] for _, data in valid},
+                reservation_slot__in={data['reservation_slot'] for _, data in valid},
+            ).values_list('reservation_date', 'reservation_slot')) if valid else set()
+            new = []
+            for index, data in valid:
+                pair = (data['reservation_date'], data['reservation_slot'])
+                if pair in taken:
+                    results[index] = {'index': index, 'status': 'taken'}
+                else:
+                    # Also stops two items of this request taking the same slot.
+                    taken.add(pair)
+                    new.append((index, Booking(**data)))
+            Booking.objects.bulk_create([booking for _, booking in new])
+            # bulk_create sends no post_save.
+            transaction.on_commit(lambda: availability.invalidate(*(booking.reservation_date for _, booking in new)))
+    except IntegrityError:
+        # A slot was taken by another request since the query; nothing was booked.
+        return JsonResponse({'error': 'A reservation was taken meanwhile, nothing was booked. Retry.'}, status=409)
+
+    for index, booking in new:
+        results[index] = {'index': index, 'status': 'booked', 'id': booking.pk}
+    return JsonResponse(results, safe=False, status=201 if new else 200)
+
+
+def availability_view(request):
+    """
+    Taken and free slots for each date from ``?start=`` to ``?end=``
+    (YYYY-MM-DD, at most a year apart), or for a whole ``?month=YYYY-MM``.
+    """
+    try:
+        if 'month' in request.GET:
+            start = parse_date(request.GET['month'] + '-01')
+            end = start and availability.next_month(start) - timedelta(days=1)
+        else:
+            start = parse_date(request.GET.get('start', ''))
+            end = parse_date(request.GET.get('end', ''))
+        valid = start is not None and end is not None and start <= end <= start + timedelta(days=366)
+    except (ValueError, OverflowError):
+        # Well formed but impossible, like 2030-13 or 2030-02-30, or so
+        # close to date.max that the range can't be computed.
+        valid = False
+    if not valid:
+        return JsonResponse(
+            {'error': 'Pass ?month=YYYY-MM, or ?start= and ?end= dates at most a year apart.'}, status=400,
+        )
+    days = [
+        {
+            'date': day.isoformat(),
+            'taken': taken,
+            'free': [slot for slot in availability.SLOTS if slot not in taken],
+        }
+        for day, taken in availability.taken_slots(start, end).items()
+    ]
+    return JsonResponse({'slots': availability.SLOTS, 'days': days})
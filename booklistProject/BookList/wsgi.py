@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BookList.settings')
 
 application = get_wsgi_application()
+
+# Build the book search index before the first request rather than during it.
+from BookListAPI.search import warm  # noqa: E402
+
+warm()
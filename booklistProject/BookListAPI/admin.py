@@ -1,3 +1,12 @@
 from django.contrib import admin
 
+from .models import Book
+
 # Register your models here.
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ('title', 'author', 'price')
+    search_fields = ('title', 'author')
+    ordering = ('title',)
+    # Skip the extra COUNT(*) over the whole catalog when searching.
+    show_full_result_count = False
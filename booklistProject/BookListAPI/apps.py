@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BooklistapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'BookListAPI'
+
+    def ready(self):
+        # Keeps the search index current (see BookListAPI.search).
+        from . import signals  # noqa: F401
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from BookListAPI.models import Book
+from BookListAPI.pagination import KeysetPagination
+from BookListAPI.serializers import BookSerializer
+from BookListAPI.views import BookListView
+
+WORDS = (
+    'salt fat acid heat bread pasta soup garden kitchen spice fire smoke '
+    'sweet sour bitter honey olive lemon herb market table feast harvest '
+    'family coast island mountain village street night morning simple modern'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the catalog with --books rows (if it has fewer) and compare the "
+        "time to read a page at growing depths with keyset and OFFSET paging."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000_000)
+        parser.add_argument('--depths', type=int, nargs='+', default=[0, 1_000, 10_000, 100_000, 500_000])
+        parser.add_argument('--ordering', default='price', choices=BookListView.ORDERINGS)
+        parser.add_argument('--author', help="Also filter by this author.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.seed(options['books'], options['seed'])
+        params = {'ordering': options['ordering']}
+        if options['author']:
+            params['author'] = options['author']
+        view = BookListView()
+        view.request = Request(APIRequestFactory().get('/api/books/', params))
+        queryset = view.get_queryset()
+        page_size = KeysetPagination.page_size
+
+        self.stdout.write(f"{'depth':>10}{'keyset ms':>12}{'offset ms':>12}  (median of {options['repeat']})")
+        for depth in options['depths']:
+            cursor = None
+            if depth:
+                last = queryset[depth - 1:depth].first()
+                if last is None:
+                    continue
+                paginator = KeysetPagination()
+                paginator.column = view.request.query_params['ordering'].lstrip('-')
+                cursor = paginator.encode_cursor(last)
+            request = Request(APIRequestFactory().get('/api/books/', {**params, 'cursor': cursor or ''}))
+
+            def keyset():
+                return BookSerializer(KeysetPagination().paginate_queryset(queryset, request), many=True).data
+
+            def offset():
+                return BookSerializer(queryset[depth:depth + page_size], many=True).data
+
+            assert keyset() == offset(), f"keyset and OFFSET pages differ at depth {depth}"
+            self.stdout.write(
+                f'{depth:>10}{self.time(keyset, options["repeat"]):>12.2f}{self.time(offset, options["repeat"]):>12.2f}'
+            )
+
+        # The plan shows whether the deepest page is an index seek.
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(queryset, request)
+        cursor = paginator.decode_cursor(request, queryset.model)
+        deepest = paginator.seek(queryset, *cursor) if cursor else queryset
+        self.stdout.write(f"\nPlan of the deepest keyset page:\n{deepest[:page_size].explain()}")
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def seed(self, books, seed):
+        existing = Book.objects.count()
+        if existing >= books:
+            return
+        rng = random.Random(seed)
+        authors = [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}son' for _ in range(5000)]
+        self.stdout.write(f"Seeding {books - existing} books...")
+        batch = []
+        with transaction.atomic():
+            for _ in range(books - existing):
+                batch.append(Book(
+                    title=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title(),
+                    author=rng.choice(authors),
+                    price=Decimal(rng.randint(500, 6000)) / 100,
+                ))
+                if len(batch) == 10_000:
+                    Book.objects.bulk_create(batch)
+                    batch = []
+            Book.objects.bulk_create(batch)
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from functools import reduce
+from operator import and_
+
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from BookListAPI.models import Book
+from BookListAPI.search import index, tokenize
+from BookListAPI.serializers import BookSerializer
+
+from .bench_books import WORDS, Command as BenchBooksCommand
+
+
+class Command(BenchBooksCommand):
+    help = (
+        "Seed the catalog with --books rows (if it has fewer) and compare the "
+        "latency of searches through the in-memory index with icontains (LIKE) "
+        "queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['queries'] < 2:
+            raise CommandError("--queries must be at least 2, for the p99.")
+        self.seed(options['books'], options['seed'])
+        start = time.perf_counter()
+        index.build()
+        self.stdout.write(
+            f"Indexed {len(index.documents)} books, {len(index.words)} words, "
+            f"in {time.perf_counter() - start:.1f}s."
+        )
+
+        rng = random.Random(options['seed'])
+        authors = list(Book.objects.values_list('author', flat=True)[:1000])
+        queries = [self.query(rng, authors) for _ in range(options['queries'])]
+        limit = options['limit']
+
+        def indexed(query):
+            ids, count = index.search(query, limit)
+            found = Book.objects.in_bulk(ids)
+            return count, BookSerializer([found[pk] for pk in ids if pk in found], many=True).data
+
+        def like(query):
+            # The best LIKE can do without reading every match: the first
+            # ``limit`` by id, unranked, and a COUNT for the total.
+            queryset = Book.objects.filter(self.like(query)).order_by('id')
+            return queryset.count(), BookSerializer(queryset[:limit], many=True).data
+
+        for query in queries[:10]:
+            ids, _ = index.search(query, limit)
+            assert Book.objects.filter(self.like(query), pk__in=ids).count() == len(ids), (
+                f"index results for {query!r} do not match LIKE"
+            )
+
+        self.stdout.write(f"{'':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}  ({len(queries)} queries)")
+        for name, func in (('index', indexed), ('LIKE', like)):
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                func(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Inclusive: between the timings, never past max when there are few.
+            p99 = statistics.quantiles(timings, n=100, method='inclusive')[98]
+            self.stdout.write(f'{name:>10}{statistics.median(timings):>10.2f}{p99:>10.2f}{max(timings):>10.2f}')
+
+    def query(self, rng, authors):
+        """One or two words, as users type them: the last may be cut short."""
+        words = rng.sample(WORDS, rng.randint(1, 2))
+        if rng.random() < 0.3:
+            words[-1] = rng.choice(tokenize(rng.choice(authors)))
+        words[-1] = words[-1][:rng.randint(2, len(words[-1]))]
+        return ' '.join(words)
+
+    def like(self, query):
+        return reduce(and_, (Q(title__icontains=term) | Q(author__icontains=term) for term in tokenize(query)))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('author', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['title', 'id', 'author', 'price'], name='book_title_idx'), models.Index(fields=['price', 'id', 'title', 'author'], name='book_price_idx'), models.Index(fields=['author', 'id', 'title', 'price'], name='book_author_idx'), models.Index(fields=['author', 'title', 'id', 'price'], name='book_author_title_idx'), models.Index(fields=['author', 'price', 'id', 'title'], name='book_author_price_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,23 @@
 from django.db import models
 
 # Create your models here.
+class Book(models.Model):
+    title = models.CharField(max_length=255)
+    author = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    class Meta:
+        # One index per (filter, ordering) the list endpoint allows. Each
+        # starts with the filter and sort columns, then id for the keyset
+        # tie-break, then the rest of the row, so a page is read from the
+        # index alone, in order, without touching the table.
+        indexes = [
+            models.Index(fields=['title', 'id', 'author', 'price'], name='book_title_idx'),
+            models.Index(fields=['price', 'id', 'title', 'author'], name='book_price_idx'),
+            models.Index(fields=['author', 'id', 'title', 'price'], name='book_author_idx'),
+            models.Index(fields=['author', 'title', 'id', 'price'], name='book_author_title_idx'),
+            models.Index(fields=['author', 'price', 'id', 'title'], name='book_author_price_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} by {self.author}"
@@ -0,0 +1,108 @@
+"""
+Keyset pagination.
+
+Pages are ordered by one column plus ``id`` as a tie-break, and the cursor
+holds the (value, id) of the last row sent. The next page is read with
+
+    WHERE col >= value AND NOT (col = value AND id <= last_id)
+    ORDER BY col, id LIMIT n
+
+which is an index range seek whatever the depth, unlike OFFSET (which
+reads and discards every earlier row), and unlike DRF's CursorPagination,
+which adds an offset for runs of equal values.
+"""
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """``queryset`` must be ordered by ``(field, 'id')`` or by ``'id'``, either direction."""
+        self.request = request
+        self.field = queryset.query.order_by[0]
+        self.descending = self.field.startswith('-')
+        self.column = self.field.lstrip('-')
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = self.seek(queryset, *cursor)
+        # One extra row tells whether there is a next page.
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def seek(self, queryset, value, last_id):
+        """The rows of ``queryset`` after ``(value, last_id)``."""
+        if self.descending:
+            return queryset.filter(**{f'{self.column}__lte': value}).exclude(
+                **{self.column: value, 'id__gte': last_id}
+            )
+        return queryset.filter(**{f'{self.column}__gte': value}).exclude(
+            **{self.column: value, 'id__lte': last_id}
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, model):
+        """
+        The (value, id) in the cursor, converted by the model's fields: a
+        cursor that was tampered with is a 404, never a query error.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return self.clean(model._meta.get_field(self.column), value), self.clean(model._meta.pk, last_id)
+        except (TypeError, ValueError, OverflowError, ValidationError):
+            raise NotFound('Invalid cursor.')
+
+    def clean(self, field, value):
+        if value is None:
+            raise ValidationError('Cursor values are never null.')
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+
+    def encode_cursor(self, row):
+        position = [getattr(row, self.column), row.id]
+        return base64.urlsafe_b64encode(json.dumps(position, cls=DjangoJSONEncoder).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(self.page[-1])
+        return self.request.build_absolute_uri(f'{self.request.path}?{urlencode(params)}')
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,173 @@
+"""
+In-process full-text search over the book catalog.
+
+BookIndex maps every word of a book's title and author to the ids of the
+books containing it, and keeps the words sorted so a prefix ("harv")
+finds all the words it starts ("harvest", "harvey") with a binary search.
+A query matches the books containing every one of its words, each taken
+as a prefix, ranked by where and how fully each word matched (WEIGHTS),
+then by id.
+
+Each process builds its own index from the Book table on the first
+search, or at startup from BookList.wsgi, and keeps it current from the
+post_save and post_delete signals once their writes commit
+(BookListAPI.signals). Writes made by other processes, and bulk_create()
+and update(), which send no signals, are only seen once the index is
+rebuilt with ``index.build()``.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.db import DatabaseError
+
+from .models import Book
+
+WORD = re.compile(r'\w+')
+
+# Points a query word earns for a book: by the field it matched in, and
+# whether it is a whole word of that field or only the start of one.
+WEIGHTS = {
+    ('title', True): 4,
+    ('title', False): 2,
+    ('author', True): 3,
+    ('author', False): 1,
+}
+
+
+def tokenize(text):
+    return WORD.findall(text.casefold())
+
+
+class BookIndex:
+    FIELDS = ('title', 'author')
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built = False
+        # field -> word -> ids of the books with that word in that field.
+        self.postings = {field: {} for field in self.FIELDS}
+        # Every word of postings, sorted, for prefix lookups.
+        self.words = []
+        # book id -> (title words, author words).
+        self.documents = {}
+
+    def build(self):
+        """(Re)build the index from the Book table."""
+        with self.lock:
+            self.postings = {field: {} for field in self.FIELDS}
+            self.documents = {}
+            rows = Book.objects.values_list('pk', *self.FIELDS).iterator(chunk_size=10_000)
+            for pk, *values in rows:
+                document = self.documents[pk] = tuple(frozenset(tokenize(value)) for value in values)
+                for field, words in zip(self.FIELDS, document):
+                    postings = self.postings[field]
+                    for word in words:
+                        postings.setdefault(word, set()).add(pk)
+            self.words = sorted(set().union(*self.postings.values()))
+            self.built = True
+
+    def ensure_built(self):
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.build()
+
+    def add(self, book):
+        """Index ``book``, or re-index it if it was already indexed."""
+        document = tuple(frozenset(tokenize(getattr(book, field))) for field in self.FIELDS)
+        with self.lock:
+            # Not built yet: the build will read the book from the table.
+            if not self.built or self.documents.get(book.pk) == document:
+                return
+            self.remove(book.pk)
+            self.documents[book.pk] = document
+            for field, words in zip(self.FIELDS, document):
+                postings = self.postings[field]
+                for word in words:
+                    if not any(word in self.postings[other] for other in self.FIELDS):
+                        insort(self.words, word)
+                    postings.setdefault(word, set()).add(book.pk)
+
+    def remove(self, pk):
+        with self.lock:
+            document = self.documents.pop(pk, None)
+            if document is None:
+                return
+            for field, words in zip(self.FIELDS, document):
+                postings = self.postings[field]
+                for word in words:
+                    postings[word].discard(pk)
+                    if not postings[word]:
+                        del postings[word]
+                        if not any(word in self.postings[other] for other in self.FIELDS):
+                            del self.words[bisect_left(self.words, word)]
+
+    def expand(self, prefix):
+        """The indexed words starting with ``prefix``."""
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\U0010ffff', start)
+        return self.words[start:end]
+
+    def tiers(self, term):
+        """
+        (weight, ids) for each way a book can match ``term`` (WEIGHTS), each
+        book counted in the best one only.
+        """
+        words = self.expand(term)
+        seen = set()
+        tiers = []
+        for (field, whole), weight in sorted(WEIGHTS.items(), key=lambda item: -item[1]):
+            postings = self.postings[field]
+            if whole:
+                ids = postings.get(term, set()) - seen
+            else:
+                ids = set().union(*(postings[word] for word in words if word in postings)) - seen
+            seen |= ids
+            tiers.append((weight, ids))
+        return tiers
+
+    def search(self, query, limit=20):
+        """
+        The ids of the best ``limit`` books for ``query``, best first, and
+        the number of books matching it.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        self.ensure_built()
+        with self.lock:
+            # Books by score, built with set operations rather than by
+            # scoring each book: a common word can match much of the catalog.
+            groups = {0: None}
+            for term in terms:
+                tiers = self.tiers(term)
+                scored = {}
+                for score, ids in groups.items():
+                    for weight, tier in tiers:
+                        matched = tier if ids is None else ids & tier
+                        if matched:
+                            scored.setdefault(score + weight, set()).update(matched)
+                groups = scored
+                if not groups:
+                    return [], 0
+
+        best = []
+        for score in sorted(groups, reverse=True):
+            best += heapq.nsmallest(limit - len(best), groups[score])
+            if len(best) >= limit:
+                break
+        return best, sum(map(len, groups.values()))
+
+
+index = BookIndex()
+
+
+def warm():
+    """Build the index now rather than on the first search."""
+    try:
+        index.ensure_built()
+    except DatabaseError:
+        # Not migrated yet; the first search builds it instead.
+        pass
@@ -0,0 +1,23 @@
+import copy
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Book
+from .search import index
+
+
+# The index only changes once the write commits, so a rolled back write
+# never shows in search results. The book is copied as saved: the
+# instance may be changed again before the commit.
+@receiver(post_save, sender=Book, dispatch_uid='book_search_index')
+def index_book(sender, instance, using, **kwargs):
+    book = copy.copy(instance)
+    transaction.on_commit(lambda: index.add(book), using=using)
+
+
+@receiver(post_delete, sender=Book, dispatch_uid='book_search_unindex')
+def unindex_book(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: index.remove(pk), using=using)
@@ -1,3 +1,111 @@
+import base64
+import io
+import json
+from decimal import Decimal
+
+from django.core.management import call_command
 from django.test import TestCase
 
+from .models import Book
+from .search import index
+
 # Create your tests here.
+
+
+def cursor(*position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class BookListTests(TestCase):
+    def setUp(self):
+        for title, author, price in (
+            ('Salt', 'Nosrat', '10.00'), ('Bread', 'Hamelman', '12.50'), ('Soup', 'Nosrat', '10.00'),
+            ('Olive', 'Ottolenghi', '8.00'), ('Feast', 'Ottolenghi', '12.50'), ('Honey', 'Hamelman', '10.00'),
+            ('Smoke', 'Franklin', '30.00'),
+        ):
+            Book.objects.create(title=title, author=author, price=Decimal(price))
+
+    def walk(self, **params):
+        ids = []
+        response = self.client.get('/api/books/', {'page_size': 3, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [book['id'] for book in response.json()['results']]
+            if not response.json()['next']:
+                return ids
+            response = self.client.get(response.json()['next'])
+
+    def test_pages_walk_every_book_once_in_order(self):
+        for ordering in ('id', '-id', 'title', 'price', '-price'):
+            tie_break = '-id' if ordering.startswith('-') else 'id'
+            expected = list(Book.objects.order_by(ordering, tie_break).values_list('id', flat=True))
+            self.assertEqual(self.walk(ordering=ordering), expected, ordering)
+
+    def test_filters(self):
+        ids = self.walk(author='Nosrat', min_price='9', max_price='10')
+        self.assertEqual(ids, list(Book.objects.filter(author='Nosrat').values_list('id', flat=True)))
+
+    def test_bad_filters_are_refused(self):
+        for value in ('abc', 'NaN', 'Infinity', '-inf'):
+            response = self.client.get('/api/books/', {'min_price': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(response.json(), {'min_price': ['Expected a number.']})
+        self.assertEqual(self.client.get('/api/books/', {'ordering': 'author'}).status_code, 400)
+
+    def test_bad_cursors_are_not_found(self):
+        for value in ('garbage', cursor('cheap', 1), cursor(None, 1), cursor(10, None), cursor(1e300, 1),
+                      cursor(10, 10 ** 30), cursor(10, 1, 2)):
+            response = self.client.get('/api/books/', {'ordering': 'price', 'cursor': value})
+            self.assertEqual(response.status_code, 404, value)
+        # 1e400 is read as an infinite float, which no id can hold.
+        response = self.client.get('/api/books/', {'cursor': base64.urlsafe_b64encode(b'[1, 1e400]').decode()})
+        self.assertEqual(response.status_code, 404)
+
+
+class BookSearchTests(TestCase):
+    def setUp(self):
+        self.tart = Book.objects.create(title='Lemon Tart', author='Roux', price=10)
+        self.soup = Book.objects.create(title='Soup', author='Lemonson', price=10)
+        self.lemonade = Book.objects.create(title='Lemonade', author='Roux', price=10)
+        self.grove = Book.objects.create(title='Grove', author='Lemon', price=10)
+        Book.objects.create(title='Bread', author='Roux', price=10)
+        index.build()
+
+    def search(self, query, **params):
+        response = self.client.get('/api/books/search', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count'], [book['id'] for book in response.json()['results']]
+
+    def test_ranking(self):
+        # Whole title word, whole author word, start of a title word, start
+        # of an author word.
+        self.assertEqual(
+            self.search('lemon'), (4, [self.tart.id, self.grove.id, self.lemonade.id, self.soup.id])
+        )
+        self.assertEqual(self.search('lemon', limit=2), (4, [self.tart.id, self.grove.id]))
+        self.assertEqual(self.search('roux lem'), (2, [self.tart.id, self.lemonade.id]))
+
+    def test_bad_queries_are_refused(self):
+        for params in ({'q': ' '}, {'q': 'lemon', 'limit': 'x'}, {'q': 'lemon', 'limit': 0}):
+            self.assertEqual(self.client.get('/api/books/search', params).status_code, 400, params)
+
+    def test_writes_reach_the_index_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='Lemon Curd', author='Roux', price=10)
+            self.assertEqual(self.search('curd'), (0, []))
+        self.assertEqual(self.search('curd'), (1, [book.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = 'Lime Curd'
+            book.save()
+        self.assertEqual(self.search('lemon curd'), (0, []))
+        self.assertEqual(self.search('lime'), (1, [book.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertEqual(self.search('curd'), (0, []))
+
+
+class BenchBooksTests(TestCase):
+    def test_runs_on_a_small_catalog(self):
+        out = io.StringIO()
+        call_command('bench_books', books=30, depths=[0, 10], repeat=1, stdout=out)
+        self.assertIn('Plan of the deepest keyset page', out.getvalue())
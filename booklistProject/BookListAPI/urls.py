@@ -2,5 +2,6 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('books/', views.books)
-]
\ No newline at end of file
+    path('books/', views.books, name='book-list'),
+    path('books/search', views.search, name='book-search'),
+]
@@ -1,10 +1,79 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import render
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.decorators import api_view
+
+from . import search as book_search
+from .models import Book
+from .pagination import KeysetPagination
+from .serializers import BookSerializer
 
 # Create your views here.
-@api_view()
-def books(request):
-    return Response("List of books",
-                    status=status.HTTP_200_OK)
+class BookListView(generics.ListAPIView):
+    """
+    The catalog, filtered by ``?author=`` (exact), ``?min_price=`` and
+    ``?max_price=``, ordered by ``?ordering=`` one of ORDERINGS. Every
+    combination is served from one of the Book indexes.
+    """
+    serializer_class = BookSerializer
+    pagination_class = KeysetPagination
+    ORDERINGS = ['id', '-id', 'title', '-title', 'price', '-price']
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = Book.objects.all()
+        if 'author' in params:
+            queryset = queryset.filter(author=params['author'])
+        for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+            if param in params:
+                try:
+                    value = Decimal(params[param])
+                    if not value.is_finite():
+                        raise InvalidOperation
+                    queryset = queryset.filter(**{lookup: value})
+                except (InvalidOperation, DjangoValidationError):
+                    raise ValidationError({param: ['Expected a number.']})
+
+        ordering = params.get('ordering', 'id')
+        if ordering not in self.ORDERINGS:
+            raise ValidationError({'ordering': [f"Expected one of {', '.join(self.ORDERINGS)}."]})
+        if ordering.lstrip('-') == 'id':
+            return queryset.order_by(ordering)
+        # id breaks ties, in the same direction, for the keyset cursor.
+        return queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+books = BookListView.as_view()
+
+
+class BookSearchView(generics.GenericAPIView):
+    """
+    The best ``?limit=`` (default 20, at most MAX_LIMIT) books having every
+    word of ``?q=`` in their title or author, each word taken as a prefix,
+    ranked by BookListAPI.search.
+    """
+    serializer_class = BookSerializer
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if not book_search.tokenize(query):
+            raise ValidationError({'q': ['Expected at least one word.']})
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': ['Expected a whole number.']})
+        if limit < 1:
+            raise ValidationError({'limit': ['Expected a positive number.']})
+
+        ids, count = book_search.index.search(query, limit)
+        found = Book.objects.in_bulk(ids)
+        # Skips books another process deleted since this one indexed them.
+        books = [found[pk] for pk in ids if pk in found]
+        return Response({'count': count, 'results': self.get_serializer(books, many=True).data})
+
+
+search = BookSearchView.as_view()
@@ -1,6 +1,294 @@
-def main():
-    print("Hello from booklistproject!")
+"""
+Benchmark the book API in-process.
+
+Boots Django against a temporary SQLite database, seeds it with --books
+books, and sends each scenario's requests straight to the WSGI handler
+from --concurrency threads or processes, so the numbers measure Django,
+DRF and the queries rather than a server or the network.
+
+Results are written as JSON, each figure the median of --rounds runs.
+The exit status is 1 when any scenario had requests that did not answer
+2xx: their latencies are not the ones being measured. With --baseline,
+each scenario is compared with the same scenario in that file, and the
+exit status is also 1 when its p99 latency rose, or its throughput fell,
+by more than --tolerance.
+
+    booklist-bench --books 100000 --concurrency 4 --output results.json
+    booklist-bench --baseline bench_baseline.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+BASE_DIR = Path(__file__).resolve().parent
+BASELINE = BASE_DIR / 'bench_baseline.json'
+
+application = None
+
+
+def setup(database):
+    """Boot Django against ``database``; only the first call in a process does anything."""
+    global application
+    if application is not None:
+        return
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BookList.settings')
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    # As in production: DEBUG keeps every query in memory.
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['localhost']
+
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+
+def seed(books, seed):
+    from django.core.management import call_command
+
+    from BookListAPI.management.commands.bench_books import Command as BenchBooks
+    from BookListAPI.search import warm
+
+    call_command('migrate', verbosity=0)
+    BenchBooks(stdout=io.StringIO()).seed(books, seed)
+    warm()
+
+
+def scenarios(seed):
+    """Scenario name -> the URLs its requests cycle through."""
+    from BookListAPI.management.commands.bench_books import WORDS
+    from BookListAPI.models import Book
+    from BookListAPI.pagination import KeysetPagination
+
+    rng = random.Random(seed)
+    books = Book.objects.count()
+    authors = list(Book.objects.values_list('author', flat=True).distinct()[:200])
+
+    def deep(ordering):
+        paginator = KeysetPagination()
+        paginator.column = ordering.lstrip('-')
+        last = Book.objects.order_by(ordering, '-id' if ordering.startswith('-') else 'id')[books // 2]
+        return '/api/books/?' + urlencode({'ordering': ordering, 'cursor': paginator.encode_cursor(last)})
+
+    def typed(word):
+        return word[:rng.randint(2, len(word))]
+
+    return {
+        'list': ['/api/books/'],
+        'list_by_price': ['/api/books/?ordering=price&min_price=20'],
+        'list_by_author': [
+            '/api/books/?' + urlencode({'author': author, 'ordering': '-price'}) for author in authors
+        ],
+        'deep_page': [deep('price'), deep('-title')],
+        'search': [
+            '/api/books/search?' + urlencode({'q': f'{rng.choice(WORDS)} {typed(rng.choice(WORDS))}'})
+            for _ in range(200)
+        ],
+    }
+
+
+def environ(url):
+    path, _, query = url.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def run(database, urls, start, count):
+    """
+    Send ``count`` requests, cycling through ``urls`` from ``start``.
+    Returns their latencies in ms and the number that were not 2xx.
+    """
+    from django.db import connections
+
+    setup(database)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    latencies = []
+    try:
+        for i in range(start, start + count):
+            began = time.perf_counter()
+            response = application(environ(urls[i % len(urls)]), start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            latencies.append((time.perf_counter() - began) * 1000)
+    finally:
+        connections.close_all()
+    return latencies, sum(not status.startswith('2') for status in statuses)
+
+
+def benchmark(database, urls, requests, concurrency, executor):
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    starts = [sum(shares[:i]) for i in range(concurrency)]
+    began = time.perf_counter()
+    done = list(executor.map(run, [database] * concurrency, [urls] * concurrency, starts, shares))
+    elapsed = time.perf_counter() - began
+    latencies = sorted(latency for worker, _ in done for latency in worker)
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in done),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 3),
+        # Inclusive: between the samples, never past max_ms when there are few.
+        'p90_ms': round(statistics.quantiles(latencies, n=10, method='inclusive')[8], 3),
+        'p99_ms': round(statistics.quantiles(latencies, n=100, method='inclusive')[98], 3),
+        'max_ms': round(latencies[-1], 3),
+    }
+
+
+def failures(results):
+    """Lines describing each scenario of ``results`` with failed requests."""
+    return [
+        f"{name}: {result['errors']} of {result['requests']} requests did not answer 2xx"
+        for name, result in results['results'].items()
+        if result['errors']
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing each regression of ``results`` against ``baseline``."""
+    regressions = []
+    for key in ('books', 'concurrency', 'mode'):
+        if results['meta'][key] != baseline['meta'][key]:
+            print(f"warning: --{key} is {results['meta'][key]}, the baseline used {baseline['meta'][key]}", file=sys.stderr)
+    for name, result in results['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']} ms -> {result['p99_ms']} ms")
+        if result['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']}/s -> {result['throughput']}/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--books', type=int, default=50_000)
+    parser.add_argument('--requests', type=int, default=1_000, help="Requests per scenario.")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+    parser.add_argument('--scenarios', nargs='+', help="Run only these scenarios.")
+    parser.add_argument('--warmup', type=int, default=50, help="Untimed requests per scenario.")
+    parser.add_argument(
+        '--rounds', type=int, default=3, help="Times to run each scenario; each figure is the median of the rounds.",
+    )
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', default='-', help="JSON file to write, '-' for stdout.")
+    parser.add_argument('--baseline', type=Path, help="Results to compare with.")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also write the results to {BASELINE.name}.")
+    options = parser.parse_args(argv)
+    # Percentiles need at least two latencies.
+    if options.requests < 2:
+        parser.error("--requests must be at least 2")
+    if options.warmup < 0 or options.warmup == 1:
+        parser.error("--warmup must be 0 or at least 2")
+    if options.rounds < 1 or options.concurrency < 1:
+        parser.error("--rounds and --concurrency must be at least 1")
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.sqlite3')
+        setup(database)
+        seed(options.books, options.seed)
+        from django.db import connections
+
+        urls = scenarios(options.seed)
+        connections.close_all()
+        unknown = set(options.scenarios or []) - set(urls)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))} (expected {', '.join(urls)})")
+
+        if options.mode == 'threads':
+            executor = ThreadPoolExecutor(options.concurrency)
+        else:
+            # Forked where possible, so workers start with the booted app and
+            # the built search index; elsewhere each boots on its first task.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            executor = ProcessPoolExecutor(options.concurrency, mp_context=context)
+        results = {}
+        with executor:
+            for name in options.scenarios or urls:
+                if options.warmup:
+                    benchmark(database, urls[name], options.warmup, options.concurrency, executor)
+                rounds = [
+                    benchmark(database, urls[name], options.requests, options.concurrency, executor)
+                    for _ in range(options.rounds)
+                ]
+                results[name] = {key: statistics.median(result[key] for result in rounds) for key in rounds[0]}
+                print(f"{name:>16}: {results[name]['throughput']:>8}/s  p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+
+    import django
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'books': options.books,
+            'requests': options.requests,
+            'concurrency': options.concurrency,
+            'mode': options.mode,
+            'rounds': options.rounds,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2) + '\n'
+    if options.output == '-':
+        sys.stdout.write(output)
+    else:
+        Path(options.output).write_text(output)
+
+    failed = failures(report)
+    for failure in failed:
+        print(f"ERRORS {failure}", file=sys.stderr)
+    if options.save_baseline:
+        if failed:
+            print(f"{BASELINE.name} not written: requests failed.", file=sys.stderr)
+        else:
+            BASELINE.write_text(output)
+
+    regressions = []
+    if options.baseline:
+        regressions = compare(report, json.loads(options.baseline.read_text()), options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if failed or regressions else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
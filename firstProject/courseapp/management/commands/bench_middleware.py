@@ -0,0 +1,109 @@
+import io
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+# Middleware that fail without others earlier in the stack.
+REQUIRES = {
+    "django.contrib.auth.middleware.AuthenticationMiddleware": [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+    ],
+    "django.contrib.messages.middleware.MessageMiddleware": [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time courseapp's index view, which does no work, through the full WSGI "
+        "handler with no middleware, with each middleware of MIDDLEWARE on its "
+        "own, and with all of them, and report what each one adds per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20_000, help="Requests per timing.")
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="Rounds, each timing every stack in turn; the fastest timing of each stack is kept.",
+        )
+
+    def handle(self, *args, **options):
+        middleware = list(settings.MIDDLEWARE)
+        if not middleware:
+            raise CommandError("MIDDLEWARE is empty.")
+
+        # Each middleware on its own, with those it needs (charged
+        # separately), then the whole stack.
+        stacks = {(): []}
+        for name in middleware:
+            required = tuple(other for other in middleware if other in REQUIRES.get(name, []))
+            stacks[required] = [other for other in middleware if other in required]
+            stacks[(name,)] = [other for other in middleware if other in required or other == name]
+        stacks[tuple(middleware)] = middleware
+
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["localhost"]):
+            path = reverse("index")
+            handlers = {}
+            for key, stack in stacks.items():
+                with override_settings(MIDDLEWARE=stack):
+                    handlers[key] = WSGIHandler()
+            best = dict.fromkeys(handlers, float("inf"))
+            # Rounds rather than one stack after the other, so drift in the
+            # machine's speed is spread over every stack.
+            for _ in range(options["repeat"]):
+                for key, handler in handlers.items():
+                    best[key] = min(best[key], self.time(handler, path, options["requests"], stacks[key]))
+
+        bare = best[()]
+        self.stdout.write(f"{'':<50}{'us/request':>12}{'+us':>10}")
+        self.stdout.write(f"{'(no middleware)':<50}{bare:>12.1f}")
+        total = 0
+        for name in middleware:
+            required = tuple(other for other in middleware if other in REQUIRES.get(name, []))
+            cost = best[(name,)] - best[required]
+            total += cost
+            label = self.short(name) + "".join(f" (+ {self.short(other)})" for other in required)
+            self.stdout.write(f"{label:<50}{best[(name,)]:>12.1f}{cost:>+10.1f}")
+        full = best[tuple(middleware)]
+        self.stdout.write(f"{'(all of MIDDLEWARE)':<50}{full:>12.1f}{full - bare:>+10.1f}")
+        self.stdout.write(f"{'(sum of the above)':<50}{'':>12}{total:>+10.1f}")
+
+    def short(self, name):
+        return name.rsplit(".", 1)[1]
+
+    def time(self, handler, path, requests, middleware):
+        """Mean time, in microseconds, of ``requests`` requests to ``path``."""
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        statuses = set()
+
+        def start_response(status, headers, exc_info=None):
+            statuses.add(status)
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = handler({**environ, "wsgi.input": io.BytesIO()}, start_response)
+            response.close()
+        elapsed = (time.perf_counter() - start) / requests * 1_000_000
+        failed = statuses - {"200 OK"}
+        if failed:
+            raise CommandError(f"{path} returned {', '.join(sorted(failed))} with MIDDLEWARE={middleware}.")
+        return elapsed
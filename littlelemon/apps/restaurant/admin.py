@@ -1,20 +1,255 @@
-from django.contrib import admin
-from .models import Menu, Booking
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import router, transaction
+from django.db.models import Count
+from django.http import HttpResponseRedirect, QueryDict
+from django.utils import timezone
+from django.utils.html import format_html
+from .allocation import NoTableFree, Seating
+from .models import ArchivedBooking, Menu, Booking, Job, StaleObjectError, Table
+from .sharding import fan_out, is_sharded, shard_for
+
+
+def admin_location(request):
+    """The location an admin page works on, kept in the changelist filters."""
+    location = (
+        request.GET.get("location")
+        or QueryDict(request.GET.get("_changelist_filters", "")).get("location")
+    )
+    return location if location in settings.LOCATION_SHARDS else settings.DEFAULT_LOCATION
+
+
+class LocationFilter(admin.SimpleListFilter):
+    """Picks the location; the row counts come from every shard."""
+    title = "location"
+    parameter_name = "location"
+
+    def lookups(self, request, model_admin):
+        counts = dict.fromkeys(settings.LOCATION_SHARDS, 0)
+        queryset = model_admin.model.objects.values("location").annotate(rows=Count("pk")).order_by()
+        for rows in fan_out(queryset).values():
+            for row in rows:
+                counts[row["location"]] = counts.get(row["location"], 0) + row["rows"]
+        return [(location, f"{location} ({count})") for location, count in counts.items()]
+
+    def queryset(self, request, queryset):
+        # LocationAdminMixin.get_queryset already reads the right shard.
+        return queryset
+
+    def choices(self, changelist):
+        current = self.value() or settings.DEFAULT_LOCATION
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": current == lookup,
+                "query_string": changelist.get_query_string({self.parameter_name: lookup}),
+                "display": title,
+            }
+
+
+class LocationAdminMixin:
+    """
+    Per-location models are shown one location at a time, picked in the
+    sidebar, and read from that location's shard. A saved row's location
+    can't be changed here; use `manage.py move_location` to move locations.
+    """
+
+    def get_list_filter(self, request):
+        return (LocationFilter, *super().get_list_filter(request))
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_location(admin_location(request))
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly = super().get_readonly_fields(request, obj)
+        return (*readonly, "location") if obj is not None else readonly
+
+    def get_changeform_initial_data(self, request):
+        return {"location": admin_location(request), **super().get_changeform_initial_data(request)}
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "location":
+            return forms.ChoiceField(choices=[(location, location) for location in settings.LOCATION_SHARDS])
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if is_sharded(db_field.related_model):
+            kwargs["queryset"] = db_field.related_model.objects.for_location(admin_location(request))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class VersionInput(forms.HiddenInput):
+    """Posts the row version back with the form, showing it as text."""
+
+    def render(self, name, value, attrs=None, renderer=None):
+        return format_html('{}{}', value, super().render(name, value, attrs, renderer))
+
+
+class VersionedAdminForm(forms.ModelForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        # self.instance was loaded when the form was posted, so it holds
+        # the current version.
+        if "version" in cleaned_data and cleaned_data["version"] != self.instance.version:
+            raise forms.ValidationError(
+                "This row was changed by someone else since you loaded the page. Reload and try again."
+            )
+        return cleaned_data
+
+
+class VersionedModelAdmin(admin.ModelAdmin):
+    """
+    Saves only if the row is still at the version the form was rendered
+    with, so two people editing the same row can't overwrite each other.
+    VersionedAdminForm reports a stale version as a form error; a write
+    that loses the race after validation aborts the whole save, change log
+    included, and the page is reloaded with an error.
+    """
+    form = VersionedAdminForm
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "version":
+            kwargs["widget"] = VersionInput
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault("form", VersionedAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic(using=router.db_for_write(type(obj), instance=obj)):
+            super().save_model(request, obj, form, change)
+
+    def changeform_view(self, request, *args, **kwargs):
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        except StaleObjectError:
+            return self.stale_response(request)
+
+    def changelist_view(self, request, *args, **kwargs):
+        try:
+            return super().changelist_view(request, *args, **kwargs)
+        except StaleObjectError:
+            return self.stale_response(request)
+
+    def stale_response(self, request):
+        # Raised by save_model() before the change was logged.
+        self.message_user(
+            request, "A row was changed by someone else and was not saved. Reload and try again.", messages.ERROR,
+        )
+        return HttpResponseRedirect(request.get_full_path())
+
 
 # Register your models here.
 @admin.register(Menu)
-class MenuAdmin(admin.ModelAdmin):
-    list_display = ("title", "price", "inventory")
+class MenuAdmin(LocationAdminMixin, VersionedModelAdmin):
+    list_display = ("title", "price", "inventory", "version")
     search_fields = ("title",)
     list_filter = ("price",)
     ordering = ("title",)
-    list_editable = ("price", "inventory")
+    list_editable = ("price", "inventory", "version")
+
+
+# Changing these places the booking again (apps.restaurant.allocation).
+SEATING_FIELDS = {"table", "no_of_guests", "booking_date"}
+
+
+class BookingAdminForm(VersionedAdminForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        location = self.instance.location if self.instance.pk else cleaned_data.get("location")
+        if (
+            location in settings.LOCATION_SHARDS
+            and {"no_of_guests", "booking_date"} <= cleaned_data.keys()
+            and (self.instance.pk is None or SEATING_FIELDS & set(self.changed_data))
+        ):
+            # Checked here so the form shows the error; BookingAdmin.save_model
+            # places the booking again under the lock.
+            try:
+                with transaction.atomic(using=shard_for(location)):
+                    Seating(location).place(
+                        cleaned_data["no_of_guests"], cleaned_data["booking_date"], cleaned_data.get("table"),
+                        replacing=self.instance if self.instance.pk else None,
+                    )
+            except NoTableFree as exc:
+                raise forms.ValidationError(f"{exc} Leave the table empty to pick a free one.")
+        return cleaned_data
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
-    list_display = ("name", "no_of_guests", "booking_date")
+class BookingAdmin(LocationAdminMixin, VersionedModelAdmin):
+    """Bookings take their table through a Seating, like those made with the API."""
+    form = BookingAdminForm
+    list_display = ("name", "no_of_guests", "booking_date", "table")
     search_fields = ("name",)
     list_filter = ("booking_date",)
     ordering = ("-booking_date",)
-    date_hierarchy = "booking_date"
\ No newline at end of file
+    date_hierarchy = "booking_date"
+
+    def save_model(self, request, obj, form, change):
+        if change and not SEATING_FIELDS & set(form.changed_data):
+            return super().save_model(request, obj, form, change)
+        with transaction.atomic(using=shard_for(obj.location)):
+            seating = Seating(obj.location)
+            stored = Booking.objects.using(seating.using).get(pk=obj.pk) if change else None
+            obj.table = seating.place(obj.no_of_guests, obj.booking_date, obj.table, replacing=stored)
+            super().save_model(request, obj, form, change)
+            seating.save()
+
+    def delete_model(self, request, obj):
+        with transaction.atomic(using=shard_for(obj.location)):
+            seating = Seating(obj.location)
+            seating.release(obj)
+            super().delete_model(request, obj)
+            seating.save()
+
+    def delete_queryset(self, request, queryset):
+        location = admin_location(request)
+        with transaction.atomic(using=shard_for(location)):
+            seating = Seating(location)
+            for booking in queryset.only("table_id", "booking_date"):
+                seating.release(booking)
+            super().delete_queryset(request, queryset)
+            seating.save()
+
+    def changeform_view(self, request, *args, **kwargs):
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        except NoTableFree as exc:
+            # The table was taken between validation and saving.
+            self.message_user(request, f"The booking was not saved: {exc}", messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(LocationAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "no_of_guests", "booking_date", "table_id", "archived_at")
+    search_fields = ("name",)
+    ordering = ("-booking_date",)
+    date_hierarchy = "booking_date"
+
+    # Archived bookings are history: viewable, never edited.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Table)
+class TableAdmin(LocationAdminMixin, admin.ModelAdmin):
+    list_display = ("number", "seats")
+    ordering = ("number",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("task", "status", "attempts", "run_at", "updated_at")
+    list_filter = ("status", "task")
+    ordering = ("-created_at",)
+    readonly_fields = ("last_error",)
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry(self, request, queryset):
+        queryset.update(status=Job.PENDING, attempts=0, run_at=timezone.now())
@@ -0,0 +1,282 @@
+"""
+Table allocation.
+
+A TableAllocator holds the seat usage of one day as a sorted interval
+list per table. Checking whether a table is free at a given time is a
+binary search over that table's bookings, so "can we seat N at T" costs
+O(tables * log bookings), and tables are tried smallest first so large
+tables stay free for large parties.
+
+Each worker keeps the allocators it has built (AllocatorCache), so a day
+is read from the database once rather than on every request. An
+allocator is valid for the tables it was built with, revisions included:
+every change to which table a booking holds, and when, goes through a
+Seating, which bumps the revision of the tables involved in the same
+transaction as the booking. A worker that finds a table's revision moved
+rebuilds the day; its own changes are applied to its cached allocators
+once they commit. Locations without tables book without one.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, Table
+from .sharding import shard_for
+
+
+class NoTableFree(Exception):
+    pass
+
+
+def booking_duration():
+    return timedelta(minutes=settings.SEATING['DURATION_MINUTES'])
+
+
+def signature(tables):
+    return tuple((table.pk, table.seats, table.number, table.revision) for table in tables)
+
+
+class TableSchedule:
+    """The bookings of one table as non-overlapping [start, end) intervals."""
+
+    def __init__(self, starts=None, ends=None):
+        self.starts = starts or []
+        self.ends = ends or []
+
+    def is_free(self, start, end):
+        i = bisect_right(self.starts, start)
+        if i and self.ends[i - 1] > start:
+            return False
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def add(self, start, end):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+    def remove(self, start, end):
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start and self.ends[i] == end:
+            del self.starts[i]
+            del self.ends[i]
+
+    def copy(self):
+        return TableSchedule(list(self.starts), list(self.ends))
+
+
+class TableAllocator:
+    def __init__(self, tables, bookings, first=None, last=None):
+        self.duration = booking_duration()
+        self.tables = sorted(tables, key=lambda table: (table.seats, table.number))
+        self.seats = [table.seats for table in self.tables]
+        self.schedules = {table.pk: TableSchedule() for table in self.tables}
+        # Bookings starting in (first, last) are on this allocator's day.
+        self.first = first
+        self.last = last
+        for booking in bookings:
+            if booking.table_id in self.schedules:
+                self.schedules[booking.table_id].add(booking.booking_date, booking.booking_date + self.duration)
+
+    @classmethod
+    def for_day(cls, day, location, tables=None):
+        """Build the allocator for ``day`` at ``location`` from the database."""
+        if tables is None:
+            tables = Table.objects.for_location(location)
+        # Tables first: a booking made between the two queries then shows
+        # in the allocator but not in its tables' revisions, and the
+        # allocator is rebuilt rather than trusted.
+        tables = list(tables)
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        # Bookings from the evening before can run past midnight.
+        first, last = start - booking_duration(), start + timedelta(days=1)
+        bookings = Booking.objects.for_location(location).filter(
+            table__isnull=False, booking_date__gt=first, booking_date__lt=last,
+        ).only('booking_date', 'table_id')
+        return cls(tables, bookings, first, last)
+
+    def changed(self, removed=(), added=()):
+        """
+        A copy with the ``removed`` and ``added`` (table_id, start) bookings
+        applied; the schedules of other tables are shared, never changed.
+        """
+        copy = object.__new__(TableAllocator)
+        copy.__dict__.update(self.__dict__)
+        copy.schedules = dict(self.schedules)
+        for changes, apply in ((removed, TableSchedule.remove), (added, TableSchedule.add)):
+            for table_id, start in changes:
+                if table_id not in copy.schedules or not self.first < start < self.last:
+                    continue
+                if copy.schedules[table_id] is self.schedules[table_id]:
+                    copy.schedules[table_id] = self.schedules[table_id].copy()
+                apply(copy.schedules[table_id], start, start + self.duration)
+        return copy
+
+    def find_table(self, guests, start):
+        """The smallest table that seats ``guests`` from ``start``, or None."""
+        end = start + self.duration
+        for table in self.tables[bisect_left(self.seats, guests):]:
+            if self.schedules[table.pk].is_free(start, end):
+                return table
+        return None
+
+    def can_seat(self, guests, start):
+        return self.find_table(guests, start) is not None
+
+    def availability(self, day):
+        """Free tables and the largest party that fits, for each seating time of ``day``."""
+        opens = datetime.strptime(settings.SEATING['OPENS'], '%H:%M').time()
+        closes = datetime.strptime(settings.SEATING['CLOSES'], '%H:%M').time()
+        step = timedelta(minutes=settings.SEATING['INTERVAL_MINUTES'])
+        time = timezone.make_aware(datetime.combine(day, opens))
+        last = timezone.make_aware(datetime.combine(day, closes))
+        slots = []
+        while time <= last:
+            end = time + self.duration
+            free = [table for table in self.tables if self.schedules[table.pk].is_free(time, end)]
+            slots.append({
+                'time': time,
+                'free_tables': len(free),
+                'largest_party': free[-1].seats if free else 0,
+            })
+            time += step
+        return slots
+
+
+class AllocatorCache:
+    """Allocators by (location, day), with the table signature each was built for."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, location, day, tables):
+        """The allocator for ``day``, rebuilt unless ``tables`` are those it was built for."""
+        tables = list(tables)
+        key = (location, day)
+        expected = signature(tables)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == expected:
+                self.entries.move_to_end(key)
+                return entry[1]
+        allocator = TableAllocator.for_day(day, location, tables)
+        self.put(key, expected, allocator)
+        return allocator
+
+    def put(self, key, table_signature, allocator):
+        with self.lock:
+            self.entries[key] = (table_signature, allocator)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.SEATING['CACHED_DAYS']:
+                self.entries.popitem(last=False)
+
+    def committed(self, location, before, after, removed, added):
+        """Apply a committed Seating: the allocators it started from now hold ``after``."""
+        with self.lock:
+            for key, (table_signature, allocator) in list(self.entries.items()):
+                if key[0] == location and table_signature == before:
+                    self.entries[key] = (after, allocator.changed(removed, added))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+cache = AllocatorCache()
+
+
+def availability(day, location):
+    return cache.get(location, day, Table.objects.for_location(location)).availability(day)
+
+
+class Seating:
+    """
+    The tables of ``location``, locked until the transaction on its shard
+    ends, so concurrent bookings can't take the same table. Create it
+    inside that transaction, change bookings' tables and times through
+    ``place`` (or ``allocate``) and ``release``, and call ``save`` before
+    the transaction ends.
+    """
+
+    def __init__(self, location):
+        self.location = location
+        self.using = shard_for(location)
+        self.tables = list(
+            Table.objects.for_location(location).select_for_update().order_by('seats', 'number')
+        )
+        self.allocators = {}
+        self.removed = []
+        self.added = []
+
+    def allocator(self, start):
+        day = timezone.localdate(start)
+        if day not in self.allocators:
+            # With this Seating's changes so far: a booking late in the
+            # evening also shows on the next day's allocator.
+            self.allocators[day] = cache.get(self.location, day, self.tables).changed(self.removed, self.added)
+        return self.allocators[day]
+
+    def change(self, removed=(), added=()):
+        self.removed.extend(removed)
+        self.added.extend(added)
+        self.allocators = {
+            day: allocator.changed(removed, added) for day, allocator in self.allocators.items()
+        }
+
+    def allocate(self, guests, start):
+        """
+        Give a table that seats ``guests`` from ``start`` to a booking: the
+        smallest free one, or None if all are taken.
+        """
+        table = self.allocator(start).find_table(guests, start)
+        if table is not None:
+            self.change(added=[(table.pk, start)])
+        return table
+
+    def place(self, guests, start, table=None, replacing=None):
+        """
+        The table for a booking of ``guests`` from ``start``: ``table`` if
+        it is given and free, otherwise the one ``allocate`` picks, and None
+        at a location without tables. ``replacing`` is the booking as
+        stored, whose table is released first. Raises NoTableFree.
+        """
+        if replacing is not None:
+            self.release(replacing)
+        if not self.tables:
+            return None
+        if table is None:
+            table = self.allocate(guests, start)
+            if table is None:
+                raise NoTableFree("No table is free for this party at this time.")
+            return table
+        schedule = self.allocator(start).schedules.get(table.pk)
+        if schedule is None or table.seats < guests or not schedule.is_free(start, start + booking_duration()):
+            raise NoTableFree(f"{table} can't seat this party at this time.")
+        self.change(added=[(table.pk, start)])
+        return table
+
+    def release(self, booking):
+        """Free the table ``booking``, as stored, holds."""
+        if booking.table_id is not None:
+            self.change(removed=[(booking.table_id, booking.booking_date)])
+
+    def save(self):
+        touched = {table_id for table_id, _ in self.removed + self.added}
+        if not touched:
+            return
+        Table.objects.using(self.using).filter(pk__in=touched).update(revision=F('revision') + 1)
+        before = signature(self.tables)
+        for table in self.tables:
+            if table.pk in touched:
+                table.revision += 1
+        after = signature(self.tables)
+        removed, added = list(self.removed), list(self.added)
+        transaction.on_commit(
+            lambda: cache.committed(self.location, before, after, removed, added), using=self.using,
+        )
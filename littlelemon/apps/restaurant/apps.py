@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.restaurant'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import signals  # noqa: F401
+
+        # Not here: the database shouldn't be queried while apps load.
+        request_started.connect(preload_menus)
+
+
+def preload_menus(**kwargs):
+    """request_started receiver: load MENU_CACHE['PRELOAD'] before the first request."""
+    from django.core.signals import request_started
+
+    # Imported here: menu_cache loads the serializers, and with them most of
+    # DRF, which would otherwise count against STARTUP_BUDGET_MS.
+    from . import menu_cache
+
+    request_started.disconnect(preload_menus)
+    menu_cache.preload()
@@ -0,0 +1,113 @@
+"""
+Token authentication without a query per request.
+
+CachedTokenAuthentication accepts DRF's opaque token keys and signed tokens
+(see ``sign``) in the ``Authorization: Token <token>`` header. Resolved
+users are kept in a per-process LRU for settings.TOKEN_AUTH['TTL'] seconds.
+Logout, token rotation and changes to users or tokens bump the 'auth' epoch,
+and every worker empties its cache when it sees the new epoch (within
+TOKEN_AUTH['EPOCH_CHECK'] seconds, see apps.restaurant.epochs).
+
+Signed tokens carry the user id and a digest of the user's current key, so
+forged or expired ones are turned away without touching the database.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .epochs import EpochWatcher
+
+EPOCH = 'auth'
+
+signer = signing.TimestampSigner(salt='apps.restaurant.authentication')
+
+
+def key_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def sign(token):
+    """A signed token for ``token`` (a Token), valid until the key is rotated."""
+    return signer.sign_object({'u': token.user_id, 'k': key_digest(token.key)})
+
+
+class TokenCache:
+    """A thread-safe LRU of ``token -> user`` with a TTL, emptied when the epoch moves."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.epoch = None
+        self.watcher = EpochWatcher(EPOCH, lambda: settings.TOKEN_AUTH['EPOCH_CHECK'])
+
+    def get(self, token):
+        epoch = self.watcher.current()
+        with self.lock:
+            if epoch != self.epoch:
+                self.entries.clear()
+                self.epoch = epoch
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[token]
+                return None
+            self.entries.move_to_end(token)
+            return user
+
+    def put(self, token, user, epoch):
+        with self.lock:
+            # Skip users resolved before an epoch change that has since been seen.
+            if epoch != self.epoch:
+                return
+            self.entries[token] = (user, time.monotonic() + settings.TOKEN_AUTH['TTL'])
+            self.entries.move_to_end(token)
+            while len(self.entries) > settings.TOKEN_AUTH['CACHE_SIZE']:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.epoch = None
+        self.watcher.checked_at = float('-inf')
+
+
+cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        user = cache.get(key)
+        if user is None:
+            epoch = cache.epoch
+            token = self.resolve(key)
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            user = token.user
+            cache.put(key, user, epoch)
+        return (user, key)
+
+    def resolve(self, key):
+        tokens = Token.objects.select_related('user')
+        if ':' not in key:
+            token = tokens.filter(key=key).first()
+        else:
+            try:
+                payload = signer.unsign_object(key, max_age=settings.TOKEN_AUTH['SIGNED_MAX_AGE'])
+            except signing.BadSignature:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token = tokens.filter(user_id=payload['u']).first()
+            if token is not None and key_digest(token.key) != payload['k']:
+                token = None
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return token
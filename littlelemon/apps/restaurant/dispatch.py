@@ -0,0 +1,110 @@
+"""
+Per-route middleware stacks.
+
+Token-authenticated API calls never read the session, show messages or
+rely on the CSRF cookie, yet MIDDLEWARE runs all of them on every request.
+RouteDispatcher, the WSGI application, sends requests for the routes in
+STATELESS_ROUTES to a second handler whose stack is MIDDLEWARE without
+STATELESS_ROUTES['SKIP'], and every other request to the usual handler.
+Both are ordinary Django handlers, so the middleware they do run (with
+their process_view and process_exception hooks) behave as usual, and the
+system checks still see the full MIDDLEWARE.
+
+The skipped stack is checked at startup (stateless_middleware): it keeps
+SecurityMiddleware, and it may only drop CSRF protection along with the
+sessions, so that on those routes a browser's cookies authenticate nobody
+and a forged request gains nothing. Browser routes keep the full stack.
+
+The test client does not go through the WSGI application, so tests run
+every route with the full MIDDLEWARE.
+"""
+from functools import lru_cache
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.wsgi import WSGIHandler, get_path_info
+from django.urls import Resolver404, resolve
+
+SECURITY = 'django.middleware.security.SecurityMiddleware'
+SESSIONS = 'django.contrib.sessions.middleware.SessionMiddleware'
+CSRF = 'django.middleware.csrf.CsrfViewMiddleware'
+# Middleware that fail without a request.session.
+NEEDS_SESSIONS = [
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+
+def stateless_middleware(middleware, skip):
+    """``middleware`` without ``skip``, once it is checked to be safe."""
+    if SECURITY in skip:
+        raise ImproperlyConfigured(f"STATELESS_ROUTES can't skip {SECURITY}.")
+    kept = [path for path in middleware if path not in skip]
+    if SESSIONS not in kept:
+        needing = [path for path in NEEDS_SESSIONS if path in kept]
+        if needing:
+            raise ImproperlyConfigured(
+                f"STATELESS_ROUTES skips {SESSIONS}, so it must skip {', '.join(needing)} too."
+            )
+    elif CSRF not in kept:
+        raise ImproperlyConfigured(
+            f"STATELESS_ROUTES can only skip {CSRF} with {SESSIONS}: a route that "
+            f"reads the session cookie needs CSRF protection."
+        )
+    return kept
+
+
+class StackHandler(WSGIHandler):
+    """A WSGIHandler running ``middleware`` rather than MIDDLEWARE."""
+
+    def __init__(self, middleware):
+        self.middleware = middleware
+        super().__init__()
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler.load_middleware() builds the chain from settings, and
+        # runs once, at startup.
+        middleware = settings.MIDDLEWARE
+        settings.MIDDLEWARE = self.middleware
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = middleware
+
+
+@lru_cache(maxsize=4096)
+def view_name(path):
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return None
+
+
+class RouteDispatcher:
+    """WSGI application handling STATELESS_ROUTES with a shorter middleware stack."""
+
+    def __init__(self, routes):
+        # '/restaurant/booking/tables' matches that path and the paths below
+        # it, not '/restaurant/booking/tablesets'.
+        self.prefixes = [prefix.rstrip('/') for prefix in routes.get('PREFIXES', [])]
+        self.url_names = frozenset(routes.get('URL_NAMES', []))
+        self.default = WSGIHandler()
+        self.stateless = StackHandler(stateless_middleware(settings.MIDDLEWARE, routes['SKIP']))
+
+    def __call__(self, environ, start_response):
+        handler = self.stateless if self.is_stateless(get_path_info(environ) or '/') else self.default
+        return handler(environ, start_response)
+
+    def is_stateless(self, path):
+        for prefix in self.prefixes:
+            if path.startswith(prefix) and path[len(prefix):len(prefix) + 1] in ('', '/'):
+                return True
+        return bool(self.url_names) and view_name(path) in self.url_names
+
+
+def get_wsgi_application():
+    """django.core.wsgi.get_wsgi_application(), routed by STATELESS_ROUTES."""
+    django.setup(set_prefix=False)
+    routes = getattr(settings, 'STATELESS_ROUTES', None)
+    return RouteDispatcher(routes) if routes else WSGIHandler()
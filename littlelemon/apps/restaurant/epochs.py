@@ -0,0 +1,47 @@
+"""
+Cross-worker invalidation for in-process caches.
+
+A process that caches something keeps an EpochWatcher for it and drops its
+copy whenever the epoch moves; whoever changes the data calls ``bump``.
+Watchers re-read the epoch from the database at most once per ``interval``
+seconds, so a change reaches every worker within that interval at the cost
+of one small query per interval, whatever the traffic.
+"""
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Epoch
+
+
+def bump(name):
+    if not Epoch.objects.filter(name=name).update(value=F('value') + 1):
+        try:
+            with transaction.atomic():
+                Epoch.objects.create(name=name, value=1)
+        except IntegrityError:
+            # Created concurrently.
+            Epoch.objects.filter(name=name).update(value=F('value') + 1)
+
+
+def read(name):
+    return Epoch.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+class EpochWatcher:
+    """``interval`` is called for the seconds between reads, so it can follow settings."""
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self.value = None
+        self.checked_at = float('-inf')
+
+    def current(self):
+        """The epoch, re-read if the last read is older than the interval."""
+        now = time.monotonic()
+        if now - self.checked_at >= self.interval():
+            self.value = read(self.name)
+            self.checked_at = now
+        return self.value
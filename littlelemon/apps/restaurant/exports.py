@@ -0,0 +1,89 @@
+"""
+Streaming exports of bookings and the menu as CSV or NDJSON.
+
+Rows are read in primary-key order, ``chunk_size`` at a time
+(``WHERE id > last_id ORDER BY id LIMIT n``), so memory stays constant
+whatever the table size. This works the same on every backend, including
+MySQL, whose driver would otherwise buffer a whole ``.iterator()`` result
+client-side.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Booking, Menu
+
+BOOKING_FIELDS = ['id', 'location', 'name', 'no_of_guests', 'booking_date', 'table_id', 'version']
+MENU_FIELDS = ['id', 'location', 'title', 'price', 'inventory', 'version']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (``gzip;q=0`` refuses it)."""
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+
+def booking_queryset(location, since=None, until=None):
+    queryset = Booking.objects.for_location(location)
+    if since is not None:
+        queryset = queryset.filter(booking_date__date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(booking_date__date__lte=until)
+    return queryset
+
+
+def menu_queryset(location):
+    return Menu.objects.for_location(location)
+
+
+def iter_rows(queryset, fields, chunk_size=2000):
+    """Yield ``fields`` tuples of every row; ``fields`` must start with 'id'."""
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list(*fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_lines(queryset, fields, fmt, chunk_size=2000):
+    """Yield the export as lines of text, header first for CSV."""
+    rows = iter_rows(queryset, fields, chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}")
@@ -0,0 +1,170 @@
+"""
+Idempotency-Key support for POST views.
+
+The first successful (2xx) response to a POST carrying an
+``Idempotency-Key`` header is stored for ``IDEMPOTENCY['TTL']`` seconds
+and replayed for retries with the same key, without running the view
+again. Other responses are not stored, so a retry once the client has
+fixed its request runs the view. While the first request is running, the
+key is locked: concurrent duplicates wait for its response (up to
+``IDEMPOTENCY['WAIT']`` seconds) instead of writing.
+
+Keys belong to the caller: a response is only replayed to the user that
+sent the key, and keys sent without authentication form a namespace of
+their own. ``respond`` must therefore run after authentication; DRF views
+call it from ``create``, plain Django views (whose request.user is set by
+AuthenticationMiddleware) can use the ``idempotent`` decorator.
+
+This module is shared by littlelemon (apps/restaurant/idempotency.py) and
+FullStack_Exercise3 (restaurant/idempotency.py, a link to it); each
+project's ``.models`` provides IdempotencyKey.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import IdempotencyKey
+
+
+class CacheStore:
+    """Keeps responses in the default cache; needs a cache shared by all workers."""
+
+    def get(self, key):
+        return cache.get(f'idempotency:{key}')
+
+    def lock(self, key):
+        return cache.add(f'idempotency-lock:{key}', True, settings.IDEMPOTENCY['LOCK_TIMEOUT'])
+
+    def save(self, key, record):
+        cache.set(f'idempotency:{key}', record, settings.IDEMPOTENCY['TTL'])
+        self.release(key)
+
+    def release(self, key):
+        cache.delete(f'idempotency-lock:{key}')
+
+
+class DatabaseStore:
+    """Keeps responses in the IdempotencyKey table; the unique key is the lock."""
+
+    def get(self, key):
+        row = IdempotencyKey.objects.filter(
+            key=key, status_code__isnull=False, expires_at__gt=timezone.now(),
+        ).first()
+        if row is None:
+            return None
+        return {
+            'fingerprint': row.fingerprint,
+            'status': row.status_code,
+            'content': bytes(row.content),
+            'content_type': row.content_type,
+        }
+
+    def lock(self, key):
+        now = timezone.now()
+        IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY['LOCK_TIMEOUT']),
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def save(self, key, record):
+        IdempotencyKey.objects.filter(key=key).update(
+            fingerprint=record['fingerprint'],
+            status_code=record['status'],
+            content=record['content'],
+            content_type=record['content_type'],
+            expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY['TTL']),
+        )
+
+    def release(self, key):
+        IdempotencyKey.objects.filter(key=key, status_code__isnull=True).delete()
+
+
+def get_store():
+    return import_string(settings.IDEMPOTENCY['STORE'])()
+
+
+def store_key(request, key):
+    """The stored key for the client's ``key``: the caller, the path and ``key``."""
+    user = getattr(request, 'user', None)
+    caller = f'user:{user.pk}' if user is not None and user.is_authenticated else 'anonymous'
+    return hashlib.sha256(f'{caller}\n{request.path}\n{key}'.encode()).hexdigest()
+
+
+def respond(request, fingerprint, view):
+    """
+    ``view()``'s response to ``request``, or the stored response of an
+    earlier request with its Idempotency-Key. ``fingerprint`` identifies the
+    request body; a key reused with another body gets a 422.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if request.method != 'POST' or not key:
+        return view()
+
+    store = get_store()
+    key = store_key(request, key)
+    record = store.get(key)
+    if record is None and store.lock(key):
+        try:
+            response = view()
+            # DRF and template responses are rendered late; the stored
+            # copy needs the final content.
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        except BaseException:
+            store.release(key)
+            raise
+        if 200 <= response.status_code < 300:
+            store.save(key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'content': response.content,
+                'content_type': response.get('Content-Type'),
+            })
+        else:
+            store.release(key)
+        return response
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY['WAIT']
+    while record is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        record = store.get(key)
+    if record is None:
+        return JsonResponse(
+            {'detail': 'A request with this Idempotency-Key is still in progress.'},
+            status=409,
+        )
+    if record['fingerprint'] != fingerprint:
+        return JsonResponse(
+            {'detail': 'This Idempotency-Key was used with a different request body.'},
+            status=422,
+        )
+    response = HttpResponse(
+        record['content'], status=record['status'], content_type=record['content_type'],
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Make POSTs to the plain Django ``view`` safe to retry with an Idempotency-Key header."""
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        fingerprint = hashlib.sha256(request.body).hexdigest() if request.method == 'POST' else ''
+        return respond(request, fingerprint, lambda: view(request, *args, **kwargs))
+
+    return wrapped
@@ -0,0 +1,103 @@
+"""
+A small job queue stored in the project database.
+
+Jobs are rows of the Job model. Enqueue them inside the transaction that
+writes the data they describe: the job is committed (or rolled back)
+together with it, so the request returns as soon as that transaction
+commits and ``manage.py run_jobs`` does the work afterwards.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(func):
+    """Register ``func`` as a task that can be enqueued by name."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(task_name, run_at=None, **payload):
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task {task_name!r}")
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=settings.JOB_QUEUE['MAX_ATTEMPTS'],
+    )
+
+
+def claim(limit):
+    """Mark up to ``limit`` due jobs as running and return them."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_QUEUE['STALE_AFTER'])
+    # Jobs left running by a worker that died go back to the queue (run_jobs
+    # heartbeats the jobs it runs), unless that was their last attempt: a
+    # job that kills its worker must not be retried forever.
+    abandoned = Job.objects.filter(status=Job.RUNNING, updated_at__lt=stale)
+    dead = abandoned.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.DEAD, last_error='The worker running it stopped.', updated_at=now,
+    )
+    if dead:
+        logger.error("%s jobs are dead: their worker stopped on their last attempt", dead)
+    abandoned.update(status=Job.PENDING, updated_at=now)
+
+    candidates = Job.objects.filter(status=Job.PENDING, run_at__lte=now).order_by('run_at')
+    claimed = []
+    for job in candidates[:limit]:
+        # The status check makes the claim atomic without holding row
+        # locks: a concurrent worker that got there first updates nothing.
+        if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, updated_at=now,
+        ):
+            job.refresh_from_db()
+            claimed.append(job)
+    return claimed
+
+
+def heartbeat(job_ids):
+    """Mark ``job_ids`` as still running, so that ``claim`` doesn't requeue them."""
+    Job.objects.filter(pk__in=job_ids, status=Job.RUNNING).update(updated_at=timezone.now())
+
+
+def run(job):
+    try:
+        TASKS[job.task](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.DEAD
+            logger.error("Job %s is dead after %s attempts", job, job.attempts)
+        else:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning("Job %s failed, retrying at %s", job, job.run_at)
+    else:
+        job.status = Job.DONE
+    job.save(update_fields=['status', 'run_at', 'last_error', 'updated_at'])
+
+
+def retry_delay(attempts):
+    """Exponential backoff with up to 10% jitter."""
+    config = settings.JOB_QUEUE
+    delay = min(config['RETRY_BASE'] * 2 ** (attempts - 1), config['RETRY_MAX'])
+    return timedelta(seconds=delay * (1 + random.random() / 10))
+
+
+@task
+def booking_confirmation(booking_id, location=None):
+    booking = Booking.objects.for_location(location or settings.DEFAULT_LOCATION).get(pk=booking_id)
+    # Email/SMS delivery hooks in here.
+    logger.info("Booking confirmed: %s", booking)
@@ -0,0 +1,107 @@
+import time
+from datetime import datetime, time as dt_time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.restaurant.models import ArchivedBooking, Booking
+from apps.restaurant.sharding import shard_aliases
+
+# Seconds between looks at bookings other transactions hold locks on.
+LOCK_RETRY_DELAY = 1.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Move bookings dated before --before into the archive table, in short "
+        "transactions of --chunk-size rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help="Archive bookings before this date (YYYY-MM-DD).")
+        parser.add_argument('--location', help="Only archive this location (default: every shard).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks, to leave room for live traffic.")
+        parser.add_argument('--lock-retries', type=int, default=10,
+                            help="Times to look again, a second apart, when the only bookings left "
+                                 "are locked by other transactions.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the bookings to archive.")
+
+    def handle(self, *args, **options):
+        day = parse_date(options['before'])
+        if day is None:
+            raise CommandError("--before must be a date as YYYY-MM-DD.")
+        cutoff = timezone.make_aware(datetime.combine(day, dt_time.min))
+        if cutoff > timezone.now():
+            raise CommandError("--before must not be in the future.")
+
+        if options['location']:
+            if options['location'] not in settings.LOCATION_SHARDS:
+                raise CommandError(f"Unknown location {options['location']!r}.")
+            shards = [Booking.objects.for_location(options['location'])]
+        else:
+            shards = [Booking.objects.using(alias) for alias in shard_aliases()]
+
+        moved = 0
+        left = 0
+        for bookings in shards:
+            old = bookings.filter(booking_date__lt=cutoff)
+            if options['dry_run']:
+                moved += old.count()
+                continue
+            retries = 0
+            while True:
+                chunk = self.move_chunk(old, options['chunk_size'])
+                if chunk:
+                    moved += chunk
+                    retries = 0
+                    self.stdout.write(f"{moved} bookings archived")
+                    if options['pause']:
+                        time.sleep(options['pause'])
+                    continue
+                # The chunk skips locked rows: an empty one only means that
+                # any bookings still there are being changed right now.
+                if not old.exists():
+                    break
+                if retries == options['lock_retries']:
+                    left += old.count()
+                    break
+                retries += 1
+                time.sleep(LOCK_RETRY_DELAY)
+        if options['dry_run']:
+            self.stdout.write(f"{moved} bookings would be archived.")
+            return
+        if left:
+            raise CommandError(
+                f"Archived {moved} bookings, but {left} dated before {day} stayed locked by other "
+                f"transactions and were left. Run the command again to archive them."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} bookings dated before {day}."))
+
+    def move_chunk(self, queryset, size):
+        # Each chunk is its own transaction and locks only the rows it moves,
+        # so bookings being made meanwhile never wait behind the whole run.
+        # The archive table is on the same shard as the bookings. A booking
+        # is only deleted once its archived copy is inserted: if an id is
+        # already archived, the whole chunk is rolled back.
+        using = queryset.db
+        try:
+            with transaction.atomic(using=using):
+                rows = list(
+                    queryset.select_for_update(skip_locked=True).order_by('pk')
+                    .values('id', 'location', 'name', 'no_of_guests', 'booking_date', 'table_id', 'version')[:size]
+                )
+                if not rows:
+                    return 0
+                ArchivedBooking.objects.using(using).bulk_create([ArchivedBooking(**row) for row in rows])
+                Booking.objects.using(using).filter(pk__in=[row['id'] for row in rows]).delete()
+        except IntegrityError as exc:
+            raise CommandError(
+                f"Bookings {rows[0]['id']}-{rows[-1]['id']} on {using} clash with archived bookings, "
+                f"nothing in that chunk was moved: {exc}"
+            )
+        return len(rows)
@@ -0,0 +1,87 @@
+import io
+import logging
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.restaurant.dispatch import RouteDispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of a STATELESS_ROUTES endpoint through the full "
+        "MIDDLEWARE and through the shorter stack apps.restaurant.dispatch gives it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-name', default='menu-list')
+        parser.add_argument('--location', help="Add ?location= to the URL.")
+        parser.add_argument('--token', help="Send 'Authorization: Token <token>'.")
+        parser.add_argument('--host', default='localhost', help="Host header; must be in ALLOWED_HOSTS.")
+        parser.add_argument('--requests', type=int, default=5000, help="Requests per round and stack.")
+        parser.add_argument('--rounds', type=int, default=5, help="The fastest round of each stack is kept.")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'STATELESS_ROUTES', None):
+            raise CommandError("STATELESS_ROUTES is not set.")
+        path = reverse(options['url_name'])
+        dispatcher = RouteDispatcher(settings.STATELESS_ROUTES)
+        if not dispatcher.is_stateless(path):
+            raise CommandError(f"{path} is not one of STATELESS_ROUTES.")
+        handlers = {'full MIDDLEWARE': WSGIHandler(), 'stateless': dispatcher}
+
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': f"location={options['location']}" if options['location'] else '',
+            'SERVER_NAME': options['host'],
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': options['host'],
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if options['token']:
+            environ['HTTP_AUTHORIZATION'] = f"Token {options['token']}"
+
+        # The per-request log line of ServerTimingMiddleware would dominate.
+        logging.disable(logging.INFO)
+        try:
+            bodies = {name: self.request(handler, environ) for name, handler in handlers.items()}
+            if len(set(bodies.values())) != 1:
+                raise CommandError("The two stacks returned different responses.")
+            best = dict.fromkeys(handlers, float('inf'))
+            for _ in range(options['rounds']):
+                for name, handler in handlers.items():
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        self.request(handler, environ)
+                    best[name] = min(best[name], (time.perf_counter() - start) / options['requests'])
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.stdout.write(f"GET {path} ({options['url_name']}), fastest of {options['rounds']} rounds:")
+        for name, seconds in best.items():
+            self.stdout.write(f"  {name:<16}{1 / seconds:>10.0f} req/s{seconds * 1_000_000:>10.1f} us/request")
+        full, stateless = best.values()
+        self.stdout.write(f"  throughput gain {full / stateless - 1:+.1%}")
+
+    def request(self, handler, environ):
+        statuses = []
+        response = handler({**environ, 'wsgi.input': io.BytesIO()}, lambda status, headers: statuses.append(status))
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        if not statuses[0].startswith('200'):
+            raise CommandError(f"GET {environ['PATH_INFO']} returned {statuses[0]}: {body[:500]!r}")
+        return body
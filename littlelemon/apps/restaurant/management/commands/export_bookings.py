@@ -0,0 +1,55 @@
+import gzip
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.restaurant.exports import BOOKING_FIELDS, FORMATS, booking_queryset, export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream bookings to a CSV or NDJSON file (or stdout) in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', default=settings.DEFAULT_LOCATION)
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', help="First booking date to export (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Last booking date to export (YYYY-MM-DD).")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('-o', '--output', default='-', help="File to write, '-' for stdout.")
+
+    def handle(self, *args, **options):
+        since = self.parse_date(options['since'], 'since')
+        until = self.parse_date(options['until'], 'until')
+        if options['location'] not in settings.LOCATION_SHARDS:
+            raise CommandError(f"Unknown location {options['location']!r}.")
+        lines = export_lines(
+            booking_queryset(options['location'], since, until),
+            BOOKING_FIELDS, options['format'], options['chunk_size'],
+        )
+
+        if options['output'] == '-':
+            out = gzip.open(sys.stdout.buffer, 'wt', newline='') if options['gzip'] else sys.stdout
+        elif options['gzip']:
+            out = gzip.open(options['output'], 'wt', newline='')
+        else:
+            out = open(options['output'], 'w', newline='')
+        try:
+            out.writelines(lines)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    def parse_date(self, value, name):
+        if value is None:
+            return None
+        try:
+            date = parse_date(value)
+        except ValueError:
+            # Well formed but impossible, like 2030-02-30.
+            date = None
+        if date is None:
+            raise CommandError(f"--{name} must be a date as YYYY-MM-DD.")
+        return date
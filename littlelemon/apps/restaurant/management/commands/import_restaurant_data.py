@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from rest_framework.exceptions import ValidationError
+
+from apps.restaurant import menu_cache
+from apps.restaurant.allocation import NoTableFree, Seating
+from apps.restaurant.models import Booking, Menu
+from apps.restaurant.serializers import BookingSerializer, MenuSerializer
+from apps.restaurant.sharding import shard_for
+
+MODELS = {
+    'menu': (Menu, MenuSerializer),
+    'booking': (Booking, BookingSerializer),
+}
+
+
+class OrmLoader:
+    """bulk_create, one transaction per batch."""
+    name = 'bulk_create'
+
+    def __init__(self, model, connection):
+        self.model = model
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def load(self, objs):
+        with transaction.atomic(using=self.connection.alias):
+            self.model.objects.using(self.connection.alias).bulk_create(objs, batch_size=len(objs))
+
+
+class SqliteLoader(OrmLoader):
+    """executemany of one INSERT statement, all batches in one transaction."""
+    name = 'sqlite executemany'
+
+    def __enter__(self):
+        quote_name = self.connection.ops.quote_name
+        self.fields = [f for f in self.model._meta.concrete_fields if not f.primary_key]
+        columns = ', '.join(quote_name(f.column) for f in self.fields)
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote_name(self.model._meta.db_table), columns, ', '.join(['%s'] * len(self.fields)),
+        )
+        self.atomic = transaction.atomic(using=self.connection.alias)
+        self.atomic.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.atomic.__exit__(*exc_info)
+
+    def load(self, objs):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, [db_values(obj, self.fields, self.connection) for obj in objs])
+
+
+class MySQLLoader(SqliteLoader):
+    """LOAD DATA LOCAL INFILE of each batch, written to a temporary TSV file."""
+    name = 'mysql LOAD DATA LOCAL'
+
+    def __enter__(self):
+        quote_name = self.connection.ops.quote_name
+        self.fields = [f for f in self.model._meta.concrete_fields if not f.primary_key]
+        columns = ', '.join(quote_name(f.column) for f in self.fields)
+        self.sql = (
+            "LOAD DATA LOCAL INFILE %s INTO TABLE {} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({})"
+        ).format(quote_name(self.model._meta.db_table), columns)
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def load(self, objs):
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8', delete=False) as f:
+            for obj in objs:
+                values = db_values(obj, self.fields, self.connection)
+                f.write('\t'.join(tsv_value(value) for value in values) + '\n')
+        try:
+            with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+                cursor.execute(self.sql, [f.name])
+        finally:
+            os.unlink(f.name)
+
+
+def db_values(obj, fields, connection):
+    return [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+
+
+def format_errors(detail):
+    if isinstance(detail, dict):
+        return '; '.join(f"{field}: {' '.join(map(str, errors))}" for field, errors in detail.items())
+    return ' '.join(map(str, detail))
+
+
+def tsv_value(value):
+    if value is None:
+        return '\\N'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Import Menu or Booking rows from CSV or NDJSON, validated with the API "
+        "serializers and inserted in bulk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS))
+        parser.add_argument('path', help="File to read, '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--location', default=settings.DEFAULT_LOCATION,
+                            help="Location the rows belong to; they are written to its shard.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--loader', choices=['auto', 'orm'], default='auto',
+                            help="'auto' uses the database's native bulk loader when available.")
+
+    def handle(self, *args, **options):
+        model, serializer_class = MODELS[options['model']]
+        fmt = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        location = options['location']
+        if location not in settings.LOCATION_SHARDS:
+            raise CommandError(f"Unknown location {location!r}.")
+        loader = self.get_loader(model, connections[shard_for(location)], options['loader'])
+        validator = serializer_class(many=True).child
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        rows = self.read(source, fmt)
+        imported = invalid = 0
+        start = time.perf_counter()
+        try:
+            with loader:
+                while batch := list(islice(rows, options['batch_size'])):
+                    # Bookings get their tables like those made with the API,
+                    # with the tables locked until the batch is loaded.
+                    with transaction.atomic(using=loader.connection.alias):
+                        seating = Seating(location) if model is Booking else None
+                        objs = []
+                        for line, row in batch:
+                            try:
+                                obj = model(location=location, **validator.run_validation(row))
+                                if seating is not None:
+                                    obj.table = seating.place(obj.no_of_guests, obj.booking_date)
+                            except ValidationError as exc:
+                                invalid += 1
+                                self.stderr.write(f"Line {line}: {format_errors(exc.detail)}")
+                                continue
+                            except NoTableFree as exc:
+                                invalid += 1
+                                self.stderr.write(f"Line {line}: {exc}")
+                                continue
+                            objs.append(obj)
+                        if objs:
+                            loader.load(objs)
+                            imported += len(objs)
+                        if seating is not None:
+                            seating.save()
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f"{imported} rows imported, {imported / elapsed:.0f} rows/s")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            # bulk_create and the native loaders send no signals.
+            if model is Menu and imported:
+                menu_cache.changed()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {model._meta.verbose_name_plural} with {loader.name} in "
+            f"{elapsed:.2f}s ({imported / max(elapsed, 1e-9):.0f} rows/s), {invalid} invalid rows skipped."
+        ))
+
+    def read(self, source, fmt):
+        """Yield (line number in the file, row); a CSV row is numbered by the line it ends on."""
+        if fmt == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(source, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise CommandError(f"Line {number} is not valid JSON: {exc}")
+
+    def get_loader(self, model, connection, choice):
+        if choice == 'auto' and connection.vendor == 'sqlite':
+            return SqliteLoader(model, connection)
+        if (
+            choice == 'auto'
+            and connection.vendor == 'mysql'
+            and connection.settings_dict['OPTIONS'].get('local_infile')
+        ):
+            return MySQLLoader(model, connection)
+        return OrmLoader(model, connection)
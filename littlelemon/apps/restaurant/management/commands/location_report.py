@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date
+
+from apps.restaurant.models import ArchivedBooking, Booking, Menu, Table
+from apps.restaurant.sharding import fan_out
+
+
+class Command(BaseCommand):
+    help = "Per-location totals, queried on every shard in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Count bookings from this date (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Count bookings up to this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.all()
+        archived = ArchivedBooking.objects.all()
+        for name, lookup in (('since', 'booking_date__date__gte'), ('until', 'booking_date__date__lte')):
+            if options[name]:
+                day = parse_date(options[name])
+                if day is None:
+                    raise CommandError(f"--{name} must be a date as YYYY-MM-DD.")
+                bookings = bookings.filter(**{lookup: day})
+                archived = archived.filter(**{lookup: day})
+
+        report = {location: self.empty(alias) for location, alias in settings.LOCATION_SHARDS.items()}
+        queries = {
+            'bookings': bookings.values('location').annotate(count=Count('pk'), guests=Sum('no_of_guests')),
+            'archived': archived.values('location').annotate(count=Count('pk')),
+            'menu': Menu.objects.values('location').annotate(count=Count('pk')),
+            'tables': Table.objects.values('location').annotate(count=Count('pk')),
+        }
+        for column, queryset in queries.items():
+            for alias, rows in fan_out(queryset.order_by()).items():
+                for row in rows:
+                    # Rows of a location missing from LOCATION_SHARDS are still counted.
+                    totals = report.setdefault(row['location'], self.empty(f"{alias}?"))
+                    totals[column] += row['count']
+                    if column == 'bookings':
+                        totals['guests'] += row['guests'] or 0
+
+        self.stdout.write(
+            f"{'location':<16}{'shard':<20}{'bookings':>10}{'guests':>10}{'archived':>10}{'menu':>8}{'tables':>8}"
+        )
+        for location, totals in sorted(report.items()):
+            self.stdout.write(
+                f"{location:<16}{totals['shard']:<20}{totals['bookings']:>10}{totals['guests']:>10}"
+                f"{totals['archived']:>10}{totals['menu']:>8}{totals['tables']:>8}"
+            )
+
+    def empty(self, shard):
+        return {'shard': shard, 'bookings': 0, 'guests': 0, 'archived': 0, 'menu': 0, 'tables': 0}
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from apps.restaurant.models import ArchivedBooking, Booking, Menu, Table
+from apps.restaurant.sharding import shard_for
+
+# Tables first: bookings reference them.
+MODELS = [Table, Menu, Booking, ArchivedBooking]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a location to another shard. Copy its rows with --to, point "
+        "LOCATION_SHARDS at the new shard, then remove the old rows with "
+        "--delete-source. Stop writes to the location while it is copied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('location')
+        parser.add_argument('--to', required=True, help="Database alias to move the location to.")
+        parser.add_argument('--from', dest='source',
+                            help="Database alias to move it from (default: its shard in LOCATION_SHARDS).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--delete-source', action='store_true',
+                            help="Delete the location's rows from the source once they are all on --to.")
+
+    def handle(self, *args, **options):
+        location = options['location']
+        if location not in settings.LOCATION_SHARDS:
+            raise CommandError(f"Unknown location {location!r}.")
+        source = options['source'] or shard_for(location)
+        target = options['to']
+        for alias in (source, target):
+            if alias not in settings.DATABASES:
+                raise CommandError(f"Unknown database {alias!r}.")
+        if source == target:
+            raise CommandError(f"{location} is already on {target}; pass --from to name the old shard.")
+
+        if options['delete_source']:
+            self.delete_source(location, source, target, options['chunk_size'])
+            return
+
+        for model in MODELS:
+            copied = self.copy(model, location, source, target, options['chunk_size'])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {copied} copied")
+        # Keep the target's id sequences ahead of the copied ids (a no-op on
+        # SQLite and MySQL, whose counters follow inserted ids).
+        with connections[target].cursor() as cursor:
+            for sql in connections[target].ops.sequence_reset_sql(no_style(), MODELS):
+                cursor.execute(sql)
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {location} from {source} to {target}. Set LOCATION_SHARDS[{location!r}] = {target!r}, "
+            f"deploy, then run: manage.py move_location {location} --from {source} --to {target} --delete-source"
+        ))
+
+    def copy(self, model, location, source, target, size):
+        # Rows keep their ids so bookings still point at their tables and
+        # clients' ids stay valid. Rows copied by an earlier, interrupted
+        # run are skipped.
+        rows = model.objects.using(source).filter(location=location).order_by('pk')
+        copied = 0
+        last_pk = None
+        while True:
+            batch = list((rows if last_pk is None else rows.filter(pk__gt=last_pk))[:size])
+            if not batch:
+                return copied
+            ids = [row.pk for row in batch]
+            clashes = list(
+                model.objects.using(target).filter(pk__in=ids).exclude(location=location)
+                .values_list('pk', flat=True)[:10]
+            )
+            if clashes:
+                raise CommandError(
+                    f"{model._meta.verbose_name_plural} {clashes} already exist on {target} for another "
+                    f"location; {location} can't be moved there without renumbering."
+                )
+            with transaction.atomic(using=target):
+                model.objects.using(target).bulk_create(batch, ignore_conflicts=True)
+            copied += len(batch)
+            last_pk = ids[-1]
+
+    def delete_source(self, location, source, target, size):
+        if shard_for(location) == source:
+            raise CommandError(f"LOCATION_SHARDS still sends {location} to {source}.")
+        for model in MODELS:
+            on_source = model.objects.using(source).filter(location=location)
+            on_target = model.objects.using(target).filter(location=location)
+            if on_target.count() < on_source.count():
+                raise CommandError(
+                    f"{target} has fewer {model._meta.verbose_name_plural} for {location} than {source}; "
+                    f"copy again before deleting."
+                )
+        for model in reversed(MODELS):
+            rows = model.objects.using(source).filter(location=location)
+            deleted = 0
+            while ids := list(rows.values_list('pk', flat=True)[:size]):
+                with transaction.atomic(using=source):
+                    model.objects.using(source).filter(pk__in=ids).delete()
+                deleted += len(ids)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {deleted} deleted from {source}")
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: imports the WSGI module the way a worker does
+# and records how long each AppConfig.ready() takes.
+BOOTSTRAP = """
+import json, time
+from django.apps import AppConfig
+
+ready_ms = {}
+create = AppConfig.create.__func__
+
+def timed_create(cls, entry):
+    app_config = create(cls, entry)
+    ready = app_config.ready
+
+    def timed_ready():
+        start = time.perf_counter()
+        ready()
+        ready_ms[app_config.label] = (time.perf_counter() - start) * 1000
+
+    app_config.ready = timed_ready
+    return app_config
+
+AppConfig.create = classmethod(timed_create)
+start = time.perf_counter()
+__import__(%(module)r)
+total_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"total_ms": total_ms, "ready_ms": ready_ms}))
+"""
+
+
+class ImportNode:
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = []
+
+
+def parse_importtime(output):
+    """Build the import tree from ``python -X importtime`` output."""
+    pending = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        node = ImportNode(name.strip(), int(self_us), int(cumulative_us))
+        # -X importtime reports a module after everything it imported.
+        node.children = pending.pop(depth + 1, [])
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+class Command(BaseCommand):
+    help = "Report the import-time tree and AppConfig.ready() durations of a cold WSGI boot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-ms', type=float, default=5.0,
+                            help="Hide imports cheaper than this (cumulative).")
+        parser.add_argument('--depth', type=int, default=3)
+        parser.add_argument('--budget', type=float, default=settings.STARTUP_BUDGET_MS,
+                            help="Fail if the boot takes longer than this many milliseconds.")
+
+    def handle(self, *args, **options):
+        module = settings.WSGI_APPLICATION.rpartition('.')[0]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP % {'module': module}],
+            cwd=settings.BASE_DIR.parent, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise CommandError(f"Booting {module} failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f"Imports slower than {options['min_ms']} ms (cumulative):")
+        roots = sorted(parse_importtime(proc.stderr), key=lambda n: -n.cumulative_us)
+        for node in roots:
+            self.write_node(node, 0, options)
+
+        self.stdout.write("\nAppConfig.ready():")
+        for label, ms in sorted(result['ready_ms'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {label:<24}{ms:>8.2f} ms")
+
+        total_ms = result['total_ms']
+        self.stdout.write(f"\nCold start of {module}: {total_ms:.1f} ms (budget {options['budget']:.0f} ms)")
+        if total_ms > options['budget']:
+            raise CommandError("Cold start is over budget.")
+
+    def write_node(self, node, depth, options):
+        if node.cumulative_us / 1000 < options['min_ms'] or depth > options['depth']:
+            return
+        self.stdout.write(
+            f"{node.cumulative_us / 1000:>9.1f} ms {node.self_us / 1000:>7.1f} ms  "
+            f"{'  ' * depth}{node.name}"
+        )
+        for child in sorted(node.children, key=lambda n: -n.cumulative_us):
+            self.write_node(child, depth + 1, options)
@@ -0,0 +1,70 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.restaurant import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        # Jobs are claimed as threads free up, so one slow job doesn't hold
+        # back the ones queued behind it. The jobs in hand are heartbeated
+        # well within STALE_AFTER, so that a long job is not requeued.
+        beat_every = settings.JOB_QUEUE['STALE_AFTER'] / 3
+        last_beat = time.monotonic()
+        running = {}
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            while running or not self.stopping:
+                free = 0 if self.stopping else options['concurrency'] - len(running)
+                claimed = jobs.claim(free) if free else []
+                running.update((pool.submit(self.run_job, job), job) for job in claimed)
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                # With the queue drained, look again after the poll interval
+                # even if no job has finished.
+                drained = len(claimed) < free
+                timeout = min(options['poll_interval'], beat_every) if drained else beat_every
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                self.report(done)
+                for future in done:
+                    del running[future]
+                if time.monotonic() - last_beat >= beat_every:
+                    jobs.heartbeat([job.pk for job in running.values()])
+                    last_beat = time.monotonic()
+
+    def report(self, done):
+        for future in done:
+            self.stdout.write(f"{future.result()}")
+
+    def run_job(self, job):
+        try:
+            jobs.run(job)
+        finally:
+            # Each pool thread has its own connections, one per database
+            # (shard) the job used.
+            connections.close_all()
+        return job
+
+    def stop(self, signum, frame):
+        # Finish the jobs in hand, then exit.
+        self.stopping = True
@@ -0,0 +1,393 @@
+import gc
+import io
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connections
+from django.template import TemplateDoesNotExist, engines
+from django.urls import get_resolver
+
+# A reloaded master inherits the listening socket and the workers it
+# replaces through these variables.
+LISTEN_FD = 'LITTLELEMON_SERVE_FD'
+RETIRING = 'LITTLELEMON_SERVE_RETIRING'
+
+# Run in a fresh interpreter: boots and warms the application the way the
+# master does, as a worker started on its own would, says so, and stays up
+# until its stdin is closed, so its memory can be read alongside the others.
+BOOTSTRAP = """
+import sys
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+application = get_internal_wsgi_application()
+from apps.restaurant.management.commands.serve import warm
+warm(application)
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+
+def memory(pid):
+    """RSS, PSS and private memory of ``pid``, in kB, from /proc/<pid>/smaps_rollup (Linux)."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def warm(application):
+    """
+    Do before forking what every worker would otherwise do on its first
+    requests: populate the URL resolvers, compile SERVE['WARM_TEMPLATES'],
+    load the menu snapshots and send SERVE['WARM_URLS'] through the
+    application, importing whatever the views load lazily. Returns the
+    warm-up requests that did not answer 200.
+    """
+    from apps.restaurant import menu_cache
+
+    get_resolver().reverse_dict
+    for name in settings.SERVE['WARM_TEMPLATES']:
+        for engine in engines.all():
+            try:
+                engine.get_template(name)
+            except TemplateDoesNotExist:
+                pass
+    menu_cache.preload()
+
+    host = next((host for host in settings.ALLOWED_HOSTS if host[:1] not in ('', '.', '*')), 'localhost')
+    failed = []
+    for url in settings.SERVE['WARM_URLS']:
+        path, _, query = url.partition('?')
+        statuses = []
+        response = application({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': host,
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        if not statuses[0].startswith('200'):
+            failed.append(f"{url}: {statuses[0]}")
+    # Each worker opens its own connections.
+    connections.close_all()
+    return failed
+
+
+class WorkerServer(WSGIServer):
+    """wsgiref's server on a listening socket shared with the other workers."""
+    timeout = 1.0
+
+    def __init__(self, listener, application, request_timeout):
+        super().__init__(listener.getsockname()[:2], WSGIRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        self.server_name, self.server_port = listener.getsockname()[:2]
+        self.setup_environ()
+        self.set_app(application)
+        self.request_timeout = request_timeout
+        self.requests = 0
+
+    def get_request(self):
+        # The listening socket is non-blocking so that workers losing the
+        # race for a connection move on. The connection blocks, but only
+        # for request_timeout seconds at a time: a client that stops
+        # sending or reading would otherwise hold the worker forever.
+        conn, address = super().get_request()
+        conn.settimeout(self.request_timeout)
+        return conn, address
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], TimeoutError):
+            sys.stderr.write(f"[{os.getpid()}] {client_address[0]} timed out, connection closed\n")
+            return
+        super().handle_error(request, client_address)
+
+    def finish_request(self, request, client_address):
+        self.requests += 1
+        super().finish_request(request, client_address)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve config.wsgi with pre-forked workers: the application is loaded "
+        "and warmed once, then forked, so workers share its memory copy-on-write. "
+        "SIGHUP reloads the code without dropping connections, SIGTERM/SIGINT stop "
+        "gracefully, SIGUSR1 prints each process's memory."
+    )
+
+    def add_arguments(self, parser):
+        config = settings.SERVE
+        parser.add_argument('--bind', default=config['BIND'], help="host:port to listen on.")
+        parser.add_argument('--workers', type=int, default=config['WORKERS'])
+        parser.add_argument('--max-requests', type=int, default=config['MAX_REQUESTS'],
+                            help="Replace a worker after this many requests (0: never).")
+        parser.add_argument('--max-requests-jitter', type=int, default=config['MAX_REQUESTS_JITTER'],
+                            help="Add up to this many to each worker's --max-requests, so they don't restart together.")
+        parser.add_argument('--graceful-timeout', type=float, default=config['GRACEFUL_TIMEOUT'],
+                            help="Seconds workers get to finish their request when stopping.")
+        parser.add_argument('--timeout', type=float, default=config['TIMEOUT'],
+                            help="Close a connection that sends or reads nothing for this many seconds.")
+        parser.add_argument('--memory-report', action='store_true',
+                            help="Once the workers are up, compare their memory with as many "
+                                 "independently started processes (Linux).")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if options['timeout'] <= 0:
+            raise CommandError("--timeout must be positive.")
+        if options['memory_report'] and not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("--memory-report reads /proc/<pid>/smaps_rollup, which this system lacks.")
+        self.options = options
+        listener = self.listen(options['bind'])
+
+        start = time.perf_counter()
+        application = get_internal_wsgi_application()
+        for failure in warm(application):
+            self.stderr.write(f"Warm-up request failed, {failure}")
+        # Objects that exist now are never collected, and the collector
+        # no longer writes to them, so their pages stay shared.
+        gc.collect()
+        gc.freeze()
+        self.log(f"Loaded {settings.WSGI_APPLICATION} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        self.workers = {}
+        self.signal = None
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(signum, self.on_signal)
+        self.spawn(listener, application)
+        self.retire([int(pid) for pid in os.environ.pop(RETIRING, '').split(',') if pid])
+        report_at = time.monotonic() + 1 if options['memory_report'] else None
+
+        while True:
+            received, self.signal = self.signal, None
+            if received in (signal.SIGTERM, signal.SIGINT):
+                self.log("Stopping")
+                self.retire(list(self.workers))
+                return
+            if received == signal.SIGHUP:
+                self.reload(listener)
+            if received == signal.SIGUSR1:
+                self.report()
+            if report_at is not None and time.monotonic() >= report_at:
+                report_at = None
+                self.report(independent=True)
+            for pid, code in self.reap():
+                started = self.workers.pop(pid, None)
+                if started is not None and code and time.monotonic() - started < 1:
+                    # Don't fork in a tight loop if workers die on start.
+                    time.sleep(1)
+            self.spawn(listener, application)
+            time.sleep(0.2)
+
+    def log(self, message):
+        self.stdout.write(f"[{os.getpid()}] {message}")
+
+    def on_signal(self, signum, frame):
+        self.signal = signum
+
+    def listen(self, bind):
+        inherited = os.environ.pop(LISTEN_FD, None)
+        if inherited is not None:
+            listener = socket.socket(fileno=int(inherited))
+        else:
+            host, _, port = bind.rpartition(':')
+            try:
+                listener = socket.create_server((host or '127.0.0.1', int(port)), backlog=2048)
+            except (ValueError, OSError) as exc:
+                raise CommandError(f"Can't listen on {bind}: {exc}")
+        listener.setblocking(False)
+        host, port = listener.getsockname()[:2]
+        self.log(f"Listening on http://{host}:{port}/")
+        return listener
+
+    def spawn(self, listener, application):
+        """Fork workers until there are --workers of them."""
+        while len(self.workers) < self.options['workers']:
+            self.fork(listener, application)
+
+    def fork(self, listener, application):
+        max_requests = self.options['max_requests']
+        if max_requests:
+            max_requests += random.randint(0, self.options['max_requests_jitter'])
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        try:
+            self.work(listener, application, max_requests)
+        except BaseException:
+            traceback.print_exc()
+            os._exit(1)
+        os._exit(0)
+
+    def work(self, listener, application, max_requests):
+        master = os.getppid()
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        server = WorkerServer(listener, application, self.options['timeout'])
+        while not stopping and os.getppid() == master:
+            server.handle_request()
+            if max_requests and server.requests >= max_requests:
+                self.log(f"Served {server.requests} requests, exiting to be replaced")
+                break
+        connections.close_all()
+
+    def reap(self):
+        """(pid, exit status) of the children that have exited."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            yield pid, os.waitstatus_to_exitcode(status)
+
+    def retire(self, pids):
+        """Stop ``pids`` once they have finished their current request."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.options['graceful_timeout']
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid, _ in self.reap():
+                pending.discard(pid)
+                self.workers.pop(pid, None)
+            time.sleep(0.1)
+        for pid in pending:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.workers.pop(pid, None)
+        list(self.reap())
+
+    def reload(self, listener):
+        # Re-executed, the master keeps its pid, so the current workers
+        # stay its children: they keep serving while the new code loads,
+        # and the new master stops them once its own workers run.
+        self.log("Reloading")
+        listener.set_inheritable(True)
+        os.environ[LISTEN_FD] = str(listener.fileno())
+        os.environ[RETIRING] = ','.join(str(pid) for pid in self.workers)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, sys.orig_argv)
+
+    def report(self, independent=False):
+        """
+        Log the memory of the master and each worker. With ``independent``,
+        also start as many workers each booting on its own, and compare the
+        two sets, read at the same moment since PSS splits pages shared
+        between them.
+        """
+        processes = []
+        try:
+            if independent:
+                processes = self.start_independent(len(self.workers))
+                if processes is None:
+                    return
+            try:
+                master = memory(os.getpid())
+                workers = {pid: memory(pid) for pid in self.workers}
+                alone = [memory(process.pid) for process in processes]
+            except (OSError, KeyError) as exc:
+                self.stderr.write(f"Can't read process memory: {exc}")
+                return
+        finally:
+            for process in processes:
+                process.stdin.close()
+                process.wait()
+
+        self.log(f"{'':<14}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}")
+        rows = [('master', os.getpid(), master)]
+        rows += [(f'worker {i}', pid, usage) for i, (pid, usage) in enumerate(workers.items(), start=1)]
+        rows += [(f'independent {i}', process.pid, usage)
+                 for i, (process, usage) in enumerate(zip(processes, alone), start=1)]
+        for name, pid, usage in rows:
+            self.log(
+                f"{name:<14}{pid:>8}{usage['rss'] / 1024:>10.1f}{usage['pss'] / 1024:>10.1f}"
+                f"{usage['private'] / 1024:>12.1f}"
+            )
+        forked = [master, *workers.values()]
+        self.log(
+            f"{len(workers)} forked workers and the master: {total(forked, 'pss'):.1f} MB PSS, "
+            f"{total(forked, 'private'):.1f} MB private"
+        )
+        if not independent:
+            return
+        separate, shared = total(alone, 'pss'), total(forked, 'pss')
+        self.log(
+            f"{len(alone)} independently started workers: {separate:.1f} MB PSS, "
+            f"{total(alone, 'private'):.1f} MB private; forking saves {separate - shared:.1f} MB "
+            f"({1 - shared / separate:.0%}) PSS. Workers unshare pages as they run; send SIGUSR1 "
+            f"for a later reading."
+        )
+
+    def start_independent(self, count):
+        """``count`` processes booted with BOOTSTRAP, once all are warm, or None."""
+        processes = [
+            subprocess.Popen(
+                [sys.executable, '-c', BOOTSTRAP],
+                cwd=settings.BASE_DIR.parent, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, text=True,
+                env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE),
+            )
+            for _ in range(count)
+        ]
+        for process in processes:
+            if process.stdout.readline().strip() != 'ready':
+                for other in processes:
+                    other.kill()
+                    other.wait()
+                self.stderr.write(f"Starting an independent worker failed:\n{process.stderr.read()[-2000:]}")
+                return None
+        return processes
+
+
+def total(usages, field):
+    """The sum of ``field`` over ``usages``, in MB."""
+    return sum(usage[field] for usage in usages) / 1024
@@ -0,0 +1,81 @@
+"""
+The menu, served from memory.
+
+Every worker keeps each location's menu as a MenuSnapshot: the items as
+MenuSerializer renders them, taken at one value of the 'menu' epoch and
+never changed afterwards. The menu endpoints answer GETs from it without a
+query. Every Menu write bumps the epoch once it commits (signals, and
+`manage.py import_restaurant_data` for its bulk inserts), and workers check
+the epoch at most every MENU_CACHE['EPOCH_CHECK'] seconds, so a change
+reaches all of them within that. A worker's own writes are seen at once.
+
+The locations in MENU_CACHE['PRELOAD'] are loaded before a worker's first
+request (apps.preload_menus, which also keeps this module out of the
+boot), the others on their first read.
+"""
+import threading
+
+from django.conf import settings
+
+from . import epochs
+from .models import Menu
+from .serializers import MenuSerializer
+
+EPOCH = 'menu'
+
+
+class MenuSnapshot:
+    """One location's menu at ``epoch``; treat ``items`` and ``by_id`` as read-only."""
+
+    def __init__(self, location, epoch):
+        self.location = location
+        self.epoch = epoch
+        data = MenuSerializer(Menu.objects.for_location(location).order_by('pk'), many=True).data
+        self.items = tuple(dict(item) for item in data)
+        self.by_id = {item['id']: item for item in self.items}
+
+
+class MenuCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # location -> MenuSnapshot, replaced rather than updated so readers
+        # never need the lock.
+        self.snapshots = {}
+        self.watcher = epochs.EpochWatcher(EPOCH, lambda: settings.MENU_CACHE['EPOCH_CHECK'])
+
+    def get(self, location):
+        """``location``'s snapshot, reloaded if the menu changed since it was taken."""
+        # The epoch is read before the rows, so a write racing with the load
+        # leaves a snapshot older than the epoch, and it is loaded again.
+        epoch = self.watcher.current()
+        snapshot = self.snapshots.get(location)
+        if snapshot is None or snapshot.epoch != epoch:
+            with self.lock:
+                snapshot = self.snapshots.get(location)
+                if snapshot is None or snapshot.epoch != epoch:
+                    snapshot = MenuSnapshot(location, epoch)
+                    self.snapshots = {**self.snapshots, location: snapshot}
+        return snapshot
+
+    def expire(self):
+        """Re-read the epoch on the next ``get``."""
+        self.watcher.checked_at = float('-inf')
+
+    def clear(self):
+        self.snapshots = {}
+        self.expire()
+
+
+cache = MenuCache()
+
+
+def changed():
+    """Call once a Menu write has committed."""
+    epochs.bump(EPOCH)
+    cache.expire()
+
+
+def preload():
+    """Load MENU_CACHE['PRELOAD']."""
+    for location in settings.MENU_CACHE['PRELOAD']:
+        cache.get(location)
@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sampled fraction of requests, plus any request carrying an
+    ``X-Profile-Token`` header that matches ``PROFILING['TOKEN']``.
+
+    Profiles are written to ``PROFILING['DIR']``, which keeps at most
+    ``PROFILING['MAX_FILES']`` files. The ``sample`` mode writes folded
+    stacks (``.folded``) for flamegraph.pl/speedscope, ``cprofile`` writes
+    ``.pstats`` files. When profiling is disabled the middleware removes
+    itself from the stack at startup.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'PROFILING', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get('SAMPLE_RATE', 0.0)
+        self.token = config.get('TOKEN', '')
+        self.mode = config.get('MODE', 'sample')
+        self.interval = config.get('INTERVAL', 0.005)
+        max_files = config.get('MAX_FILES', 100)
+        if max_files < 1:
+            # profiles[:-0] is empty: 0 would keep every profile, not none.
+            raise ImproperlyConfigured(
+                "PROFILING['MAX_FILES'] must be at least 1; set PROFILING['ENABLED'] = False to keep no profiles."
+            )
+        self.ring = ProfileRing(config['DIR'], max_files)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            name = self.ring.write(self.profile_name(request, 'pstats'), profiler.dump_stats)
+        else:
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            name = self.ring.write(self.profile_name(request, 'folded'), sampler.dump)
+        response['X-Profile-Id'] = name
+        return response
+
+    def should_profile(self, request):
+        token = request.headers.get('X-Profile-Token')
+        if token and self.token:
+            return hmac.compare_digest(token, self.token)
+        return random.random() < self.sample_rate
+
+    def profile_name(self, request, extension):
+        match = request.resolver_match
+        label = match.url_name if match and match.url_name else 'unresolved'
+        return f"{time.time_ns()}-{request.method.lower()}-{label}.{extension}"
+
+
+class StackSampler:
+    """Collect the stacks of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                module = frame.f_globals.get('__name__', '?')
+                stack.append(f"{module}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileRing:
+    """A directory holding at most ``max_files`` profiles, oldest dropped first."""
+
+    def __init__(self, directory, max_files):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def write(self, name, dump):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{name}.tmp"
+        dump(str(tmp))
+        os.replace(tmp, self.directory / name)
+        with self._lock:
+            profiles = sorted(p for p in self.directory.iterdir() if not p.name.startswith('.'))
+            for old in profiles[:-self.max_files]:
+                old.unlink(missing_ok=True)
+        return name
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_booking_version_menu_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True)),
+                ('seats', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='table',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='restaurant.table'),
+        ),
+    ]
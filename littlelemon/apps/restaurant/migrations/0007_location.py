@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:00
+
+import apps.restaurant.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='location',
+            field=models.CharField(db_index=True, default=apps.restaurant.models.default_location, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='location',
+            field=models.CharField(db_index=True, default=apps.restaurant.models.default_location, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='location',
+            field=models.CharField(db_index=True, default=apps.restaurant.models.default_location, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='location',
+            field=models.CharField(db_index=True, default=apps.restaurant.models.default_location, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='number',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='table',
+            constraint=models.UniqueConstraint(fields=('location', 'number'), name='unique_table_number'),
+        ),
+    ]
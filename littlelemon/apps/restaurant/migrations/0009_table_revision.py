@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
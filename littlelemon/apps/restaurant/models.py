@@ -1,7 +1,80 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .sharding import shard_for
+
+
+class StaleObjectError(Exception):
+    """The row was changed by someone else since this copy was loaded."""
+
+
+class VersionedModel(models.Model):
+    """
+    Optimistic concurrency control: every save bumps ``version`` with
+    ``UPDATE ... WHERE id = pk AND version = n``, and saving a copy whose
+    version is no longer current raises StaleObjectError.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, self.version + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=self.version), using, pk_val, values, update_fields, forced_update,
+        )
+        if updated:
+            self.version += 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise StaleObjectError(f"{self._meta.label} {pk_val} is not at version {self.version}")
+        return updated
+
+
+def default_location():
+    return settings.DEFAULT_LOCATION
+
+
+class LocationQuerySet(models.QuerySet):
+    def for_location(self, location):
+        """Rows of ``location``, read from its shard (see apps.restaurant.sharding)."""
+        return self.using(shard_for(location)).filter(location=location)
+
+    # create() and bulk_create() route without looking at the new rows;
+    # send them to the shard of their location instead.
+    def create(self, **kwargs):
+        if self._db is None:
+            return self.using(shard_for(kwargs.get('location') or default_location())).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None:
+            return super().bulk_create(objs, *args, **kwargs)
+        by_shard = {}
+        for obj in objs:
+            by_shard.setdefault(shard_for(obj.location), []).append(obj)
+        return [
+            created
+            for alias, shard_objs in by_shard.items()
+            for created in self.using(alias).bulk_create(shard_objs, *args, **kwargs)
+        ]
+
+
+class LocationModel(models.Model):
+    """A per-location row, stored on the location's shard."""
+    location = models.CharField(max_length=50, default=default_location, db_index=True)
+
+    objects = LocationQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
 
 # Create your models here.
-class Menu(models.Model):
+class Menu(LocationModel, VersionedModel):
     title = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     inventory = models.PositiveIntegerField()
@@ -9,10 +82,106 @@ class Menu(models.Model):
     def __str__(self):
         return self.title
 
-class Booking(models.Model):
+class Table(LocationModel):
+    number = models.PositiveIntegerField()
+    seats = models.PositiveIntegerField()
+    # Bumped whenever a booking takes or leaves the table, so workers know
+    # their cached allocators are stale (see apps.restaurant.allocation).
+    revision = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['location', 'number'], name='unique_table_number')]
+
+    def __str__(self):
+        return f"Table {self.number} ({self.seats} seats)"
+
+class Booking(LocationModel, VersionedModel):
     name = models.CharField(max_length=255)
     no_of_guests = models.PositiveIntegerField()
     booking_date = models.DateTimeField()
+    # Assigned by apps.restaurant.allocation when the booking is made; None
+    # at locations without tables.
+    table = models.ForeignKey(Table, null=True, blank=True, on_delete=models.SET_NULL, related_name='bookings')
+
+    # Rows moved out by `manage.py archive_bookings` are ArchivedBookings.
+    archived = False
+
+    def __str__(self):
+        return f"{self.name} - {self.booking_date}"
+
+
+class ArchivedBooking(LocationModel):
+    """
+    A past Booking, moved out of the hot table by `manage.py archive_bookings`.
+    Keeps the original primary key so both tables can be listed together.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    no_of_guests = models.PositiveIntegerField()
+    booking_date = models.DateTimeField(db_index=True)
+    # A plain column rather than a foreign key: tables may be renumbered or
+    # removed long after the booking took place.
+    table_id = models.BigIntegerField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    archived = True
+
+    def __str__(self):
+        return f"{self.name} - {self.booking_date} (archived)"
+
+
+class Job(models.Model):
+    """A background task, stored in the database (see apps.restaurant.jobs)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),
+    ]
+
+    task = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """A stored response for an Idempotency-Key (see apps.restaurant.idempotency)."""
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    # Null while the first request with this key is still running.
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content = models.BinaryField(default=b'')
+    content_type = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class Epoch(models.Model):
+    """
+    A counter shared by all workers, bumped when data they cache in
+    process goes stale (see apps.restaurant.epochs).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
 
     def __str__(self):
-        return f"{self.name} - {self.booking_date}"
\ No newline at end of file
+        return f"{self.name} @ {self.value}"
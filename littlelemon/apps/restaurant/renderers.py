@@ -0,0 +1,11 @@
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+from .timing import TimedRendererMixin
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, BrowsableAPIRenderer):
+    pass
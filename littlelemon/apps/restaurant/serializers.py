@@ -1,25 +1,51 @@
+import sys
+
 from rest_framework import serializers
 from .models import Menu, Booking
 from django.contrib.auth.models import User
+from .timing import TimedSerializerMixin
 
-class MenuSerializer(serializers.ModelSerializer):
+class MenuSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Menu
-        fields = ['id', 'title', 'price', 'inventory']
-        read_only_fields = ['id']
+        fields = ['id', 'location', 'title', 'price', 'inventory', 'version']
+        read_only_fields = ['id', 'location', 'version']
     
     def validate_price(self, value):
         if value <= 0:
             raise serializers.ValidationError("negative price")
         return value
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+     archived = serializers.BooleanField(read_only=True)
+
      class Meta:
           model = Booking
-          fields = ['id', 'name', 'no_of_guests', 'booking_date']
-          read_only_fields = ['id']
+          fields = ['id', 'location', 'name', 'no_of_guests', 'booking_date', 'table', 'version', 'archived']
+          read_only_fields = ['id', 'location', 'table', 'version']
+
+class CachedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
+    """
+    Reverses the detail URL once per serializer, for a placeholder pk, and
+    splices each object's pk into it instead of resolving the URL pattern
+    again for every row of a list.
+    """
+    placeholder = sys.maxsize
+
+    def get_url(self, obj, view_name, request, format):
+        if self.lookup_field != 'pk' or obj.pk is None:
+            return super().get_url(obj, view_name, request, format)
+        key = (view_name, format)
+        templates = self.__dict__.setdefault('_url_templates', {})
+        if key not in templates:
+            url = self.reverse(view_name, kwargs={self.lookup_url_kwarg: self.placeholder}, request=request, format=format)
+            templates[key] = url.rpartition(str(self.placeholder))[::2]
+        prefix, suffix = templates[key]
+        return f"{prefix}{obj.pk}{suffix}"
 
 class UserSerializer(serializers.ModelSerializer):
+        url = CachedHyperlinkedIdentityField(view_name='user-detail')
+
         class Meta:
             model = User
             fields = ['url', 'username', 'email', 'groups']
@@ -0,0 +1,125 @@
+"""
+Cached database sessions with coalesced writes.
+
+Use as SESSION_ENGINE ('apps.restaurant.sessions' in littlelemon,
+'restaurant.sessions' in FullStack_Exercise3, a link to this module). On
+top of Django's cached_db engine:
+
+* sessions are read from the cache (SESSION_CACHE_ALIAS) and only fall
+  back to the database on a miss;
+* a save whose data is unchanged since it was loaded is skipped;
+* changed data goes to the cache at once, but to the database at most once
+  every SESSION_FLUSH_INTERVAL seconds per session. A session left dirty is
+  written when it is next used after the interval.
+
+New sessions, key changes, changes to the logged-in user (login, logout,
+password change) and deletions always go to the database immediately. Anything written in the last interval lives only in
+the cache, so SESSION_CACHE_ALIAS must be a cache every worker process
+shares (memcached, Redis, database). The engine refuses to load on a
+per-process cache, which SessionMiddleware does at startup.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.exceptions import ImproperlyConfigured
+
+FLUSH_INTERVAL = 30
+
+# Keys that say who is logged in; a change to any of them is never deferred.
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+# Caches that each process keeps for itself.
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def check_cache():
+    alias = settings.SESSION_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f"SESSION_ENGINE = {__name__!r} needs a cache shared by all workers, but "
+            f"CACHES[{alias!r}] is {backend}. Configure one, or use "
+            f"'django.contrib.sessions.backends.db'."
+        )
+
+
+check_cache()
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_data = None
+        self._loaded_key = None
+        self._loaded_auth = {}
+
+    @property
+    def flush_key(self):
+        return f'{self.cache_key}:flush'
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'SESSION_FLUSH_INTERVAL', FLUSH_INTERVAL)
+
+    def load(self):
+        data = super().load()
+        self._remember(data)
+        if self.session_key and data:
+            state = self._cache.get(self.flush_key)
+            if state and state['dirty'] and time.time() - state['at'] >= self.flush_interval:
+                self._session_cache = data
+                self.save_to_db()
+        return data
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None:
+            super().save(must_create)
+            self._mark_flushed()
+            self._remember(self._get_session(no_load=True))
+            return
+        data = self._get_session(no_load=must_create)
+        serialized = self.serializer().dumps(data)
+        if serialized == self._loaded_data and self.session_key == self._loaded_key:
+            return
+        state = self._cache.get(self.flush_key)
+        # cycle_key() writes the new key with the data from before the
+        # login, so the save that adds the user must not wait: with only
+        # the cache holding it, an eviction would log the user out.
+        same_user = (
+            self.session_key == self._loaded_key
+            and self._auth(data) == self._loaded_auth
+        )
+        if same_user and state and time.time() - state['at'] < self.flush_interval:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+            self._cache.set(self.flush_key, {'at': state['at'], 'dirty': True}, self.get_expiry_age())
+        else:
+            self.save_to_db()
+        self._remember(data)
+
+    def _remember(self, data):
+        """Note the data as last loaded or saved, to compare the next save against."""
+        self._loaded_data = self.serializer().dumps(data)
+        self._loaded_key = self.session_key
+        self._loaded_auth = self._auth(data)
+
+    @staticmethod
+    def _auth(data):
+        return {key: data.get(key) for key in AUTH_KEYS}
+
+    def save_to_db(self):
+        super().save()
+        self._mark_flushed()
+
+    def _mark_flushed(self):
+        self._cache.set(self.flush_key, {'at': time.time(), 'dirty': False}, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        session_key = session_key or self.session_key
+        if session_key:
+            self._cache.delete(f'{self.cache_key_prefix}{session_key}:flush')
@@ -0,0 +1,84 @@
+"""
+Location sharding.
+
+Each location's menu, tables and bookings live in the database named for it
+in settings.LOCATION_SHARDS; several locations can share a database. Rows
+carry their ``location`` and LocationRouter sends reads and writes of those
+models to its shard:
+
+* ``Model.objects.for_location(location)`` queries one location;
+* saving an instance (or following its relations) uses the instance's
+  location;
+* anything else goes to the shard of settings.DEFAULT_LOCATION.
+
+``fan_out`` runs a query on every shard for admin and reporting work, and
+``manage.py move_location`` moves a location to another shard.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SHARDED_MODELS = {'menu', 'table', 'booking', 'archivedbooking'}
+
+
+class UnknownLocation(LookupError):
+    pass
+
+
+def shard_for(location):
+    """The database alias holding ``location``."""
+    try:
+        return settings.LOCATION_SHARDS[location]
+    except KeyError:
+        raise UnknownLocation(f"No shard is configured for location {location!r}") from None
+
+
+def shard_aliases():
+    return sorted(set(settings.LOCATION_SHARDS.values()))
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'restaurant' and model._meta.model_name in SHARDED_MODELS
+
+
+def fan_out(queryset, func=list):
+    """
+    Call ``func`` with ``queryset`` on every shard, in parallel, and return
+    ``{alias: result}``. ``func`` must evaluate the queryset: the results
+    are collected after each thread has closed its connections.
+    """
+    def run(alias):
+        try:
+            return func(queryset.using(alias))
+        finally:
+            connections[alias].close()
+
+    aliases = shard_aliases()
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return dict(zip(aliases, pool.map(run, aliases)))
+
+
+class LocationRouter:
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)):
+            return shard_for(instance.location)
+        return shard_for(settings.DEFAULT_LOCATION)
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded(type(obj1)) and is_sharded(type(obj2)):
+            return obj1.location == obj2.location
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label != 'restaurant' or model_name is None:
+            return None
+        if model_name in SHARDED_MODELS:
+            return db in shard_aliases()
+        # The job queue and idempotency keys stay in the default database.
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, epochs
+from .models import Menu
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, created=False, **kwargs):
+    if not created:
+        epochs.bump(authentication.EPOCH)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, created=False, update_fields=None, **kwargs):
+    if created:
+        return
+    # Logging in only touches last_login; anything else (deactivation, a
+    # new password, permissions) must reach the cached copies.
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        epochs.bump(authentication.EPOCH)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def menu_changed(sender, using, **kwargs):
+    # Imported on use, to keep the serializers out of the boot.
+    from . import menu_cache
+
+    # Once committed, so workers reloading on the new epoch read the change.
+    transaction.on_commit(menu_cache.changed, using=using)
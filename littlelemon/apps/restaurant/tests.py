@@ -1,3 +1,611 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+
+from . import admin as restaurant_admin, allocation, authentication, epochs, jobs, menu_cache
+from .dispatch import RouteDispatcher, stateless_middleware
+from .management.commands import archive_bookings
+from .middleware import ProfileRing, ProfilingMiddleware
+from .models import ArchivedBooking, Booking, Job, Menu, Table
+from .sharding import fan_out
+
+
+# Run with the three SQLite shards of config.settings.test. Transaction test
+# cases: fan_out queries from other threads, which can't see rows inside an
+# uncommitted test transaction.
+class LocationShardingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_rows_are_stored_on_their_locations_shard(self):
+        Menu.objects.create(location='uptown', title='Mezze', price=9, inventory=5)
+        self.assertEqual(Menu.objects.using('shard_west').count(), 1)
+        self.assertEqual(Menu.objects.using('default').count(), 0)
+        self.assertEqual(Menu.objects.for_location('uptown').get().title, 'Mezze')
+        self.assertFalse(Menu.objects.for_location('main').exists())
+
+    def test_booking_api_writes_to_the_locations_shard(self):
+        Table.objects.create(location='harbour', number=1, seats=4)
+        response = self.client.post(
+            '/restaurant/booking/tables/?location=harbour',
+            {'name': 'Ana', 'no_of_guests': 2, 'booking_date': '2030-05-01T19:00:00Z'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        booking = Booking.objects.for_location('harbour').get()
+        self.assertEqual(booking.table.number, 1)
+        self.assertEqual(booking._state.db, 'shard_east')
+        self.assertFalse(Booking.objects.using('default').exists())
+        # The confirmation job is queued in the default database.
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'booking_id': booking.pk, 'location': 'harbour'})
+
+    def test_fan_out_queries_every_shard(self):
+        when = datetime(2030, 5, 1, 19, tzinfo=timezone.utc)
+        for location in ('main', 'harbour', 'old_town', 'uptown'):
+            Booking.objects.create(location=location, name=location, no_of_guests=2, booking_date=when)
+        counts = fan_out(Booking.objects.all(), lambda queryset: queryset.count())
+        self.assertEqual(counts, {'default': 1, 'shard_east': 2, 'shard_west': 1})
+
+    def test_move_location(self):
+        table = Table.objects.create(location='harbour', number=1, seats=4)
+        Booking.objects.create(
+            location='harbour', name='Ana', no_of_guests=2, table=table,
+            booking_date=datetime(2030, 5, 1, 19, tzinfo=timezone.utc),
+        )
+        Booking.objects.create(
+            location='old_town', name='Ben', no_of_guests=2,
+            booking_date=datetime(2030, 5, 1, 19, tzinfo=timezone.utc),
+        )
+        call_command('move_location', 'harbour', to='shard_west', stdout=open('/dev/null', 'w'))
+        self.assertEqual(Booking.objects.using('shard_west').get().table_id, table.pk)
+
+        shards = {'main': 'default', 'harbour': 'shard_west', 'old_town': 'shard_east', 'uptown': 'shard_west'}
+        with override_settings(LOCATION_SHARDS=shards):
+            call_command(
+                'move_location', 'harbour', source='shard_east', to='shard_west', delete_source=True,
+                stdout=open('/dev/null', 'w'),
+            )
+            self.assertEqual(Booking.objects.for_location('harbour').get().table.number, 1)
+        self.assertEqual(list(Booking.objects.using('shard_east').values_list('name', flat=True)), ['Ben'])
+        self.assertFalse(Table.objects.using('shard_east').exists())
+
+
+# Transaction test case: the jobs run in the command's pool threads.
+class RunJobsTests(TransactionTestCase):
+    def test_slow_jobs_dont_hold_back_the_queue(self):
+        quick_done = threading.Event()
+        finished = []
+
+        def slow():
+            # Only returns once the quick jobs queued behind it have run.
+            finished.append(('slow', quick_done.wait(timeout=10)))
+
+        def quick(n):
+            finished.append(n)
+            if len(finished) == 3:
+                quick_done.set()
+
+        with mock.patch.dict(jobs.TASKS, {'slow': slow, 'quick': quick}):
+            jobs.enqueue('slow')
+            for n in range(3):
+                jobs.enqueue('quick', n=n)
+            call_command('run_jobs', '--once', '--concurrency=2', '--poll-interval=0.01', stdout=io.StringIO())
+        self.assertEqual(finished[-1], ('slow', True))
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
+    def test_long_jobs_are_not_requeued(self):
+        runs = []
+
+        def slow():
+            runs.append(1)
+            time.sleep(1)
+
+        with mock.patch.dict(jobs.TASKS, {'slow': slow}), \
+                override_settings(JOB_QUEUE={**settings.JOB_QUEUE, 'STALE_AFTER': 0.3}):
+            jobs.enqueue('slow')
+            call_command('run_jobs', '--once', '--concurrency=2', '--poll-interval=0.01', stdout=io.StringIO())
+        self.assertEqual(runs, [1])
+        self.assertEqual(Job.objects.get().attempts, 1)
+
+    def test_jobs_whose_worker_stopped_are_requeued_until_their_last_attempt(self):
+        requeued = jobs.enqueue('booking_confirmation', booking_id=1)
+        given_up = jobs.enqueue('booking_confirmation', booking_id=2)
+        Job.objects.filter(pk=requeued.pk).update(status=Job.RUNNING, attempts=1)
+        Job.objects.filter(pk=given_up.pk).update(status=Job.RUNNING, attempts=given_up.max_attempts)
+        Job.objects.update(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        jobs.claim(0)
+        requeued.refresh_from_db()
+        given_up.refresh_from_db()
+        self.assertEqual(requeued.status, Job.PENDING)
+        self.assertEqual(given_up.status, Job.DEAD)
+
+
+class UserDirectoryTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', is_staff=True)
+        self.groups = [Group.objects.create(name=name) for name in ('managers', 'waiters')]
+        self.client.force_login(self.staff)
+
+    def add_users(self, count):
+        for _ in range(count):
+            user = User.objects.create_user(f'user{User.objects.count()}')
+            user.groups.set(self.groups)
+
+    def list_users(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/restaurant/users')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.add_users(2)
+        page, few = self.list_users()
+        self.assertEqual(len(page['results']), 3)
+        self.add_users(20)
+        page, many = self.list_users()
+        self.assertEqual(len(page['results']), 23)
+        self.assertEqual(few, many)
+
+    def test_urls_and_groups(self):
+        self.add_users(1)
+        user = User.objects.get(username='user1')
+        page, _ = self.list_users()
+        self.assertEqual(page['results'][1], {
+            'url': f'http://testserver/restaurant/users/{user.pk}',
+            'username': 'user1',
+            'email': '',
+            'groups': [group.pk for group in self.groups],
+        })
+        self.assertEqual(self.client.get(f'/restaurant/users/{user.pk}').json()['username'], 'user1')
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user('guest'))
+        self.assertEqual(self.client.get('/restaurant/users').status_code, 403)
+
+
+@override_settings(TOKEN_AUTH={'CACHE_SIZE': 100, 'TTL': 300, 'EPOCH_CHECK': 0, 'SIGNED_MAX_AGE': 3600})
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.cache.clear()
+        self.user = User.objects.create_user('ana', password='secret')
+        self.token = Token.objects.create(user=self.user)
+
+    def get(self, url, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {token}')
+        token_queries = [q['sql'] for q in queries if 'authtoken_token' in q['sql']]
+        return response, token_queries
+
+    def test_cached_token_skips_the_token_query(self):
+        response, token_queries = self.get('/restaurant/menu', self.token.key)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(token_queries), 1)
+        for url in ('/restaurant/menu', '/restaurant/booking/tables/'):
+            response, token_queries = self.get(url, self.token.key)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(token_queries, [])
+
+    def test_signed_token(self):
+        signed = authentication.sign(self.token)
+        self.assertEqual(self.get('/restaurant/menu', signed)[0].status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/restaurant/menu', HTTP_AUTHORIZATION=f'Token {signed[:-1]}x')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse([q for q in queries if 'authtoken_token' in q['sql']])
+
+    def test_rotate_and_logout_invalidate_cached_tokens(self):
+        old = self.token.key
+        self.assertEqual(self.get('/restaurant/menu', old)[0].status_code, 200)
+        response = self.client.post('/restaurant/auth/token/rotate', HTTP_AUTHORIZATION=f'Token {old}')
+        new = response.json()['token']
+        self.assertEqual(self.get('/restaurant/menu', old)[0].status_code, 401)
+        self.assertEqual(self.get('/restaurant/menu', new)[0].status_code, 200)
+        signed = response.json()['signed_token']
+        self.assertEqual(self.get('/restaurant/menu', signed)[0].status_code, 200)
+
+        self.client.post('/restaurant/auth/logout', HTTP_AUTHORIZATION=f'Token {new}')
+        self.assertEqual(self.get('/restaurant/menu', new)[0].status_code, 401)
+        self.assertEqual(self.get('/restaurant/menu', signed)[0].status_code, 401)
+
+    def test_obtain_token(self):
+        response = self.client.post('/restaurant/auth/token', {'username': 'ana', 'password': 'secret'})
+        self.assertEqual(response.json()['token'], self.token.key)
+
+
+class VersionedAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.item = Menu.objects.create(location='main', title='Greek salad', price=12, inventory=10)
+        self.url = f'/admin/restaurant/menu/{self.item.pk}/change/'
+
+    def post(self, version):
+        return self.client.post(self.url, {'title': 'Salad', 'price': 13, 'inventory': 10, 'version': version})
+
+    def test_stale_version_is_a_form_error(self):
+        Menu.objects.get(pk=self.item.pk).save()
+        response = self.post(version=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'changed by someone else')
+        self.assertEqual(Menu.objects.get(pk=self.item.pk).title, 'Greek salad')
+        self.assertFalse(LogEntry.objects.exists())
+
+    def test_write_losing_the_race_after_validation_is_not_logged(self):
+        def clean(form):
+            # Another save lands between validation and the write.
+            Menu.objects.get(pk=self.item.pk).save()
+            return form.cleaned_data
+
+        with mock.patch.object(restaurant_admin.VersionedAdminForm, 'clean', clean):
+            response = self.post(version=1)
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(Menu.objects.get(pk=self.item.pk).title, 'Greek salad')
+        self.assertFalse(LogEntry.objects.exists())
+        messages = [str(message) for message in response.wsgi_request._messages]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('not saved', messages[0])
+
+
+class TableAllocationTests(TestCase):
+    def setUp(self):
+        allocation.cache.clear()
+
+    def book(self, guests=2, at='2030-05-01T19:00:00Z'):
+        return self.client.post(
+            '/restaurant/booking/tables/', {'name': 'Ana', 'no_of_guests': guests, 'booking_date': at},
+            content_type='application/json',
+        )
+
+    def test_locations_without_tables_book_without_one(self):
+        response = self.book()
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(Booking.objects.get().table)
+
+    def test_days_are_read_once_per_worker(self):
+        small = Table.objects.create(location='main', number=1, seats=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.book().status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/restaurant/booking/availability?date=2030-05-01')
+        self.assertEqual(response.status_code, 200)
+        # The tables, but not the bookings.
+        self.assertFalse([q for q in queries if 'restaurant_booking' in q['sql']])
+        self.assertEqual(self.book().status_code, 400)
+
+        # Another worker's booking bumps the table's revision.
+        Booking.objects.filter(table=small).update(table=None)
+        Table.objects.filter(pk=small.pk).update(revision=small.revision + 5)
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_renaming_a_booking_leaves_the_tables_alone(self):
+        Table.objects.create(location='main', number=1, seats=2)
+        booking = self.book().json()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f"/restaurant/booking/tables/{booking['id']}/", {'name': 'Bea'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if 'restaurant_table' in q['sql']])
+
+    def test_impossible_dates_are_refused(self):
+        for day in ('', 'tomorrow', '2030-02-30', '0001-01-01', '9999-12-31'):
+            response = self.client.get(f'/restaurant/booking/availability?date={day}')
+            self.assertEqual(response.status_code, 400, day)
+
+    def test_admin_bookings_get_a_table(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        table = Table.objects.create(location='main', number=1, seats=4)
+        response = self.client.post('/admin/restaurant/booking/add/', {
+            'location': 'main', 'name': 'Ana', 'no_of_guests': 3,
+            'booking_date_0': '2030-05-01', 'booking_date_1': '19:00:00', 'version': 1,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.get().table, table)
+        response = self.client.post('/admin/restaurant/booking/add/', {
+            'location': 'main', 'name': 'Bo', 'no_of_guests': 2,
+            'booking_date_0': '2030-05-01', 'booking_date_1': '19:30:00', 'version': 1,
+        })
+        self.assertContains(response, 'No table is free')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_imported_bookings_get_a_table(self):
+        table = Table.objects.create(location='main', number=1, seats=4)
+        rows = io.StringIO(
+            'name,no_of_guests,booking_date\n'
+            'Ana,2,2030-05-01T19:00:00Z\n'
+            'Bo,2,2030-05-01T19:30:00Z\n'
+        )
+        stderr = io.StringIO()
+        with mock.patch('sys.stdin', rows):
+            call_command('import_restaurant_data', 'booking', '-', '--format=csv', stdout=io.StringIO(), stderr=stderr)
+        self.assertEqual(Booking.objects.get().table, table)
+        self.assertIn('Line 3: No table is free', stderr.getvalue())
+
+    def test_import_errors_name_the_line_of_the_file(self):
+        rows = io.StringIO('{"name": "Ana", "no_of_guests": 2, "booking_date": "2030-05-01T19:00:00Z"}\n\n{"name": "Bo"}\n')
+        stderr = io.StringIO()
+        with mock.patch('sys.stdin', rows):
+            call_command('import_restaurant_data', 'booking', '-', '--format=ndjson', stdout=io.StringIO(), stderr=stderr)
+        self.assertTrue(stderr.getvalue().startswith('Line 3: '), stderr.getvalue())
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        Menu.objects.create(location='main', title='Greek salad', price=12, inventory=10)
+
+    def test_gzip_follows_accept_encoding_quality(self):
+        for accept, gzipped in (
+            ('gzip, deflate', True),
+            ('br;q=1.0, gzip;q=0.5', True),
+            ('*', True),
+            ('gzip;q=0', False),
+            ('gzip;q=0, *', False),
+            ('identity', False),
+            ('', False),
+        ):
+            response = self.client.get('/restaurant/menu/export', HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get('Content-Encoding') == 'gzip', gzipped, accept)
+        response = self.client.get('/restaurant/menu/export?output=ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="menu.ndjson"')
+        self.assertIn(b'Greek salad', b''.join(response.streaming_content))
+
+    def test_bad_dates_are_refused(self):
+        for query in ('since=yesterday', 'since=2030-02-30', 'until=2030-13-01'):
+            self.assertEqual(self.client.get(f'/restaurant/booking/export?{query}').status_code, 400, query)
+        self.assertEqual(self.client.get('/restaurant/booking/export?since=&until=2030-01-01').status_code, 200)
+        with self.assertRaisesMessage(CommandError, '--since must be a date'):
+            call_command('export_bookings', '--since=2030-02-30', stdout=io.StringIO())
+
+
+class ArchiveBookingsTests(TestCase):
+    def test_bookings_are_kept_when_the_archive_clashes(self):
+        old = datetime(2020, 5, 1, 19, tzinfo=timezone.utc)
+        booking = Booking.objects.create(location='main', name='Ana', no_of_guests=2, booking_date=old)
+        ArchivedBooking.objects.create(id=booking.pk, location='main', name='Bo', no_of_guests=4, booking_date=old)
+        with self.assertRaisesMessage(CommandError, 'clash with archived bookings'):
+            call_command('archive_bookings', '--before=2021-01-01', '--location=main', stdout=io.StringIO())
+        self.assertTrue(Booking.objects.filter(pk=booking.pk).exists())
+        self.assertEqual(ArchivedBooking.objects.get().name, 'Bo')
+
+        ArchivedBooking.objects.all().delete()
+        call_command('archive_bookings', '--before=2021-01-01', '--location=main', stdout=io.StringIO())
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(ArchivedBooking.objects.get().name, 'Ana')
+
+    def test_locked_bookings_left_behind_are_reported(self):
+        old = datetime(2020, 5, 1, 19, tzinfo=timezone.utc)
+        Booking.objects.create(location='main', name='Ana', no_of_guests=2, booking_date=old)
+        # As if another transaction held the booking's row lock throughout.
+        with mock.patch.object(archive_bookings.Command, 'move_chunk', return_value=0), \
+                mock.patch.object(archive_bookings, 'LOCK_RETRY_DELAY', 0), \
+                self.assertRaisesMessage(CommandError, '1 dated before 2021-01-01 stayed locked'):
+            call_command('archive_bookings', '--before=2021-01-01', '--location=main', stdout=io.StringIO())
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        authentication.cache.clear()
+        self.alice = Token.objects.create(user=User.objects.create_user('alice')).key
+        self.bob = Token.objects.create(user=User.objects.create_user('bob')).key
+        allocation.cache.clear()
+        Table.objects.create(location='main', number=1, seats=2)
+
+    def post(self, token=None, guests=2, key='k-1'):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        return self.client.post(
+            '/restaurant/booking/tables/',
+            {'name': 'Ana', 'no_of_guests': guests, 'booking_date': '2030-05-01T19:00:00Z'},
+            content_type='application/json', **headers,
+        )
+
+    def test_retries_replay_the_first_response(self):
+        first = self.post(self.alice)
+        self.assertEqual(first.status_code, 201)
+        retry = self.post(self.alice)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_keys_are_not_shared_between_callers(self):
+        self.assertEqual(self.post(self.alice).status_code, 201)
+        for token in (self.bob, None):
+            response = self.post(token)
+            self.assertFalse(response.has_header('Idempotent-Replayed'))
+            # Alice's table is taken: the view ran again.
+            self.assertEqual(response.status_code, 400)
+
+    def test_errors_are_not_replayed(self):
+        self.assertEqual(self.post(self.alice, guests=4).status_code, 400)
+        Table.objects.create(location='main', number=2, seats=4)
+        response = self.post(self.alice, guests=4)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+
+@override_settings(MENU_CACHE={'EPOCH_CHECK': 0, 'PRELOAD': []})
+class MenuCacheTests(TestCase):
+    def setUp(self):
+        menu_cache.cache.clear()
+        self.item = Menu.objects.create(location='main', title='Greek salad', price=12, inventory=10)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q['sql'] for q in queries if 'restaurant_menu' in q['sql']]
+
+    def test_reads_are_served_from_the_snapshot(self):
+        self.assertEqual(len(self.get('/restaurant/menu')[1]), 1)
+        items, menu_queries = self.get('/restaurant/menu')
+        self.assertEqual([item['title'] for item in items], ['Greek salad'])
+        self.assertEqual(menu_queries, [])
+        item, menu_queries = self.get(f'/restaurant/menu/{self.item.pk}')
+        self.assertEqual(item['version'], self.item.version)
+        self.assertEqual(menu_queries, [])
+
+    def test_writes_reload_the_snapshot(self):
+        self.get('/restaurant/menu')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/restaurant/menu/{self.item.pk}', {'price': 14}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        items, menu_queries = self.get('/restaurant/menu')
+        self.assertEqual(items[0]['price'], '14.00')
+        self.assertEqual(len(menu_queries), 1)
+
+    def test_another_workers_write_is_seen_once_the_epoch_moves(self):
+        self.get('/restaurant/menu')
+        Menu.objects.filter(pk=self.item.pk).update(title='Bruschetta')
+        self.assertEqual(self.get('/restaurant/menu')[0][0]['title'], 'Greek salad')
+        epochs.bump(menu_cache.EPOCH)
+        self.assertEqual(self.get('/restaurant/menu')[0][0]['title'], 'Bruschetta')
+
+    def test_item_added_since_the_snapshot_is_read_from_the_database(self):
+        self.get('/restaurant/menu')
+        item = Menu.objects.bulk_create([Menu(location='main', title='Lemon dessert', price=6, inventory=3)])[0]
+        self.assertEqual(self.get(f'/restaurant/menu/{item.pk}')[0]['title'], 'Lemon dessert')
+
+
+class ServerTimingTests(TestCase):
+    def test_timings_are_only_reported_when_enabled(self):
+        self.assertFalse(self.client.get('/restaurant/menu').has_header('Server-Timing'))
+        with override_settings(SERVER_TIMING=True):
+            # The middleware are loaded with the client's handler.
+            response = Client().get('/restaurant/menu')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}
+        settings_override = override_settings(CACHES={'default': cache}, SESSION_FLUSH_INTERVAL=300)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.SessionStore = import_module('apps.restaurant.sessions').SessionStore
+
+    def stored(self, session_key):
+        return self.SessionStore().model.objects.get(session_key=session_key).get_decoded()
+
+    def test_changes_within_the_interval_wait_for_the_flush(self):
+        session = self.SessionStore()
+        session['first_name'] = 'Ana'
+        session.save()
+        session = self.SessionStore(session.session_key)
+        session['first_name'] = 'Bea'
+        session.save()
+        self.assertEqual(self.stored(session.session_key), {'first_name': 'Ana'})
+        self.assertEqual(self.SessionStore(session.session_key)['first_name'], 'Bea')
+
+    def test_login_is_written_to_the_database_at_once(self):
+        session = self.SessionStore()
+        session['first_name'] = 'Ana'
+        session.save()
+        session = self.SessionStore(session.session_key)
+        session.cycle_key()
+        session[SESSION_KEY] = '7'
+        session.save()
+        self.assertEqual(self.stored(session.session_key), {'first_name': 'Ana', SESSION_KEY: '7'})
+
+
+class ProfilingTests(TestCase):
+    def test_the_ring_keeps_the_newest_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ring = ProfileRing(directory, 2)
+            for n in range(4):
+                ring.write(f'{n}.folded', lambda path: open(path, 'w').close())
+            self.assertEqual(sorted(os.listdir(directory)), ['2.folded', '3.folded'])
+
+    def test_keeping_no_profiles_is_refused(self):
+        with override_settings(PROFILING={'ENABLED': True, 'DIR': 'profiles', 'MAX_FILES': 0}):
+            with self.assertRaises(ImproperlyConfigured):
+                ProfilingMiddleware(lambda request: None)
+
+
+class StatelessRoutesTests(TestCase):
+    def call(self, application, path, **headers):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), **headers,
+        }
+        started = []
+
+        def start_response(status, response_headers):
+            started.append((status, dict(response_headers)))
+
+        # As the test client does: closing the connection would lose the
+        # test's transaction.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            response = application(environ, start_response)
+            response.close()
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        return started[0]
+
+    def test_routes(self):
+        dispatcher = RouteDispatcher(settings.STATELESS_ROUTES)
+        for path in ('/restaurant/menu', '/restaurant/menu/3', '/restaurant/booking/tables/',
+                     '/restaurant/booking/availability'):
+            self.assertTrue(dispatcher.is_stateless(path), path)
+        for path in ('/restaurant/', '/restaurant/menus', '/restaurant/menu/export', '/restaurant/auth/token',
+                     '/admin/'):
+            self.assertFalse(dispatcher.is_stateless(path), path)
+
+    def test_staff_exports_keep_the_session(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        cookie = {'HTTP_COOKIE': f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}"}
+        status, headers = self.call(RouteDispatcher(settings.STATELESS_ROUTES), '/restaurant/menu/export', **cookie)
+        self.assertEqual(status, '200 OK')
+        self.assertIn('Cookie', headers['Vary'])
+
+    def test_session_cookie_is_ignored_on_stateless_routes(self):
+        self.client.force_login(User.objects.create_user('ana'))
+        cookie = {'HTTP_COOKIE': f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}"}
+        dispatcher = RouteDispatcher(settings.STATELESS_ROUTES)
+        status, headers = self.call(dispatcher.default, '/restaurant/menu', **cookie)
+        self.assertEqual(status, '200 OK')
+        self.assertIn('Cookie', headers['Vary'])
+        status, headers = self.call(dispatcher, '/restaurant/menu', **cookie)
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Cookie', headers.get('Vary', ''))
+        self.assertEqual(headers['X-Frame-Options'], 'DENY')
+
+    def test_unsafe_stacks_are_refused(self):
+        middleware = settings.MIDDLEWARE
+        for skip in (
+            ['django.middleware.security.SecurityMiddleware'],
+            ['django.middleware.csrf.CsrfViewMiddleware'],
+            ['django.contrib.sessions.middleware.SessionMiddleware'],
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                stateless_middleware(middleware, skip)
+        self.assertNotIn(
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            stateless_middleware(middleware, settings.STATELESS_ROUTES['SKIP']),
+        )
@@ -0,0 +1,144 @@
+"""
+Per-phase request timing.
+
+ServerTimingMiddleware collects how long a request spent in the database,
+in serializers, in DRF renderers and in templates, and reports it in a
+``Server-Timing`` header and a log line per request. The phases are
+recorded by the hooks below: a cursor execute wrapper, the serializer and
+renderer mixins (the renderers are in apps.restaurant.renderers, so that
+loading the middleware doesn't import DRF), and the TimedDjangoTemplates
+template backend.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, name, seconds):
+        total, count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + seconds, count + 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - start)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to ``name`` for the current request."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    Outermost middleware: times the whole request. Pair it with
+    ServerTimingViewMiddleware at the end of MIDDLEWARE so the time spent
+    in the other middleware can be told apart from the view.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        total = time.perf_counter() - start
+        view, _ = timings.phases.get('view', (0.0, 0))
+        timings.phases['middleware'] = (total - view, 1)
+        timings.phases['total'] = (total, 1)
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{count}x"' if count > 1 else '')
+            for name, (seconds, count) in timings.phases.items()
+        )
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'phases_ms': {name: round(seconds * 1000, 3) for name, (seconds, _) in timings.phases.items()},
+            'queries': timings.phases.get('db', (0, 0))[1],
+        }))
+        return response
+
+
+class ServerTimingViewMiddleware:
+    """Innermost middleware: times the view, see ServerTimingMiddleware."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with phase('view'):
+            return self.get_response(request)
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedRendererMixin:
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with phase('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering time recorded per request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
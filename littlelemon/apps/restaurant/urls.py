@@ -4,5 +4,13 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('menu', views.MenuItemView.as_view(), name = 'menu-list'),
-    path('menu/<int:pk', views.SingleMenuItemView.as_view(), name = 'menu-detail'),
+    path('menu/<int:pk>', views.SingleMenuItemView.as_view(), name = 'menu-detail'),
+    path('menu/export', views.MenuExportView.as_view(), name = 'menu-export'),
+    path('booking/export', views.BookingExportView.as_view(), name = 'booking-export'),
+    path('auth/token', views.TokenView.as_view(), name = 'auth-token'),
+    path('auth/token/rotate', views.RotateTokenView.as_view(), name = 'auth-token-rotate'),
+    path('auth/logout', views.LogoutView.as_view(), name = 'auth-logout'),
+    path('users', views.UserViewSet.as_view({'get': 'list'}), name = 'user-list'),
+    path('users/<int:pk>', views.UserViewSet.as_view({'get': 'retrieve'}), name = 'user-detail'),
+    path('booking/availability', views.TableAvailabilityView.as_view(), name = 'table-availability'),
 ]
\ No newline at end of file
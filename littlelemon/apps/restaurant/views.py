@@ -1,20 +1,310 @@
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import logout
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics, viewsets
-from .models import Menu, Booking
-from .serializers import MenuSerializer, BookingSerializer
+from django.utils.dateparse import parse_date
+from django.utils.text import compress_sequence
+from rest_framework import generics, permissions, status, viewsets
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import APIException, ParseError, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import ArchivedBooking, Menu, Booking, StaleObjectError
+from .serializers import MenuSerializer, BookingSerializer, UserSerializer
+from .jobs import enqueue
+from . import idempotency
+from .allocation import NoTableFree, Seating, availability
+from .authentication import sign
+from .sharding import shard_for
+from . import exports, menu_cache
 
 # Create your views here.
 def home(request):
     return render(request, 'restaurant/home.html')
 
-class MenuItemView(generics.ListCreateAPIView):
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since the version in If-Match.'
+    default_code = 'precondition_failed'
+
+
+class ConditionalUpdateMixin:
+    """
+    Optimistic concurrency for versioned models: responses carry the
+    version as an ETag, and PUT/PATCH with ``If-Match: "<version>"`` only
+    write if the row is still at that version, otherwise 412.
+    """
+
+    def perform_update(self, serializer):
+        if_match = self.request.headers.get('If-Match', '*').strip()
+        if if_match != '*':
+            try:
+                serializer.instance.version = int(if_match.removeprefix('W/').strip('"'))
+            except ValueError:
+                raise ParseError('Malformed If-Match header.')
+        try:
+            serializer.save()
+        except StaleObjectError:
+            raise PreconditionFailed()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Replayed idempotent responses are plain HttpResponses.
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and 'version' in data:
+            response['ETag'] = f'"{data["version"]}"'
+        return response
+
+
+class LocationMixin:
+    """One location's rows, chosen with ``?location=`` (default settings.DEFAULT_LOCATION)."""
+
+    def get_location(self):
+        location = self.request.query_params.get('location', settings.DEFAULT_LOCATION)
+        if location not in settings.LOCATION_SHARDS:
+            raise ValidationError({'location': [f"Unknown location {location!r}."]})
+        return location
+
+    def get_queryset(self):
+        return self.queryset.model.objects.for_location(self.get_location())
+
+    def perform_create(self, serializer):
+        serializer.save(location=self.get_location())
+
+
+class MenuItemView(LocationMixin, generics.ListCreateAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
-class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
+    def list(self, request, *args, **kwargs):
+        return Response(list(menu_cache.cache.get(self.get_location()).items))
+
+class SingleMenuItemView(LocationMixin, ConditionalUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
-class BookingViewSet(viewsets.ModelViewSet):
+    def retrieve(self, request, *args, **kwargs):
+        item = menu_cache.cache.get(self.get_location()).by_id.get(kwargs['pk'])
+        if item is None:
+            # Possibly added by another worker since the snapshot was taken.
+            return super().retrieve(request, *args, **kwargs)
+        return Response(item)
+
+class BookingViewSet(LocationMixin, ConditionalUpdateMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all()
-    serializer_class = BookingSerializer
\ No newline at end of file
+    serializer_class = BookingSerializer
+    archive_fields = ['id', 'location', 'name', 'no_of_guests', 'booking_date', 'table_id', 'version']
+
+    def create(self, request, *args, **kwargs):
+        # Here rather than around dispatch: the Idempotency-Key belongs to
+        # the authenticated caller. The body may already have been parsed
+        # (for the CSRF check), so the parsed data is fingerprinted. The
+        # response is finalized early so that the stored copy can be rendered.
+        fingerprint = hashlib.sha256(json.dumps(request.data, sort_keys=True, default=str).encode()).hexdigest()
+        create = partial(super().create, request, *args, **kwargs)
+        return idempotency.respond(
+            request, fingerprint, lambda: self.finalize_response(request, create(), *args, **kwargs),
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Archived bookings are only read on request (``?include_archived=1``)
+        # so the usual listing never touches the archive table.
+        if request.query_params.get('include_archived') != '1':
+            return super().list(request, *args, **kwargs)
+        location = self.get_location()
+        rows = Booking.objects.for_location(location).values(*self.archive_fields, archived=Value(False)).union(
+            ArchivedBooking.objects.for_location(location).values(*self.archive_fields, archived=Value(True)),
+            all=True,
+        ).order_by('-booking_date', '-id')
+        page = self.paginate_queryset(rows)
+        bookings = [self.booking_from_row(row) for row in (rows if page is None else page)]
+        serializer = self.get_serializer(bookings, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @staticmethod
+    def booking_from_row(row):
+        archived = row.pop('archived')
+        booking = Booking(**row)
+        booking.archived = archived
+        return booking
+
+    def perform_create(self, serializer):
+        # The confirmation is sent by `manage.py run_jobs`, outside the
+        # request. Jobs live in the default database: when the location's
+        # shard is that database the job is committed together with the
+        # booking, otherwise it is queued once the booking has committed.
+        location = self.get_location()
+        using = shard_for(location)
+        with transaction.atomic(using=using):
+            data = serializer.validated_data
+            seating = Seating(location)
+            table = self.pick_table(seating, data['no_of_guests'], data['booking_date'])
+            booking = serializer.save(table=table, location=location)
+            seating.save()
+            confirm = partial(enqueue, 'booking_confirmation', booking_id=booking.pk, location=location)
+            if using == DEFAULT_DB_ALIAS:
+                confirm()
+            else:
+                transaction.on_commit(confirm, using=using)
+
+    def perform_update(self, serializer):
+        booking = serializer.instance
+        guests = serializer.validated_data.get('no_of_guests', booking.no_of_guests)
+        start = serializer.validated_data.get('booking_date', booking.booking_date)
+        if (guests, start) == (booking.no_of_guests, booking.booking_date) and booking.table_id is not None:
+            # Nothing is re-seated, so the location's tables aren't locked.
+            return super().perform_update(serializer)
+        with transaction.atomic(using=shard_for(booking.location)):
+            seating = Seating(booking.location)
+            booking.table = self.pick_table(seating, guests, start, replacing=booking)
+            super().perform_update(serializer)
+            seating.save()
+
+    def perform_destroy(self, booking):
+        with transaction.atomic(using=shard_for(booking.location)):
+            seating = Seating(booking.location)
+            seating.release(booking)
+            booking.delete()
+            seating.save()
+
+    def pick_table(self, seating, guests, start, replacing=None):
+        try:
+            return seating.place(guests, start, replacing=replacing)
+        except NoTableFree as exc:
+            raise ValidationError({'booking_date': [str(exc)]})
+
+
+def token_response(token):
+    return Response({'token': token.key, 'signed_token': sign(token)})
+
+
+class TokenView(ObtainAuthToken):
+    """Exchange a username and password for the user's token, opaque and signed."""
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, _ = Token.objects.get_or_create(user=serializer.validated_data['user'])
+        return token_response(token)
+
+
+class RotateTokenView(APIView):
+    """Replace the caller's token; the old one stops working on every worker."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        with transaction.atomic():
+            Token.objects.filter(user=request.user).delete()
+            token = Token.objects.create(user=request.user)
+        return token_response(token)
+
+
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        logout(request)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserCursorPagination(CursorPagination):
+    # Cursor paging reads each page with an indexed ``WHERE id > cursor``,
+    # never a growing OFFSET, so deep pages cost the same as the first.
+    ordering = 'id'
+    page_size = 50
+
+
+class UserViewSet(viewsets.ReadOnlyModelViewSet):
+    """Staff directory of user accounts."""
+    # Groups of the whole page come in one extra query, not one per user.
+    queryset = User.objects.prefetch_related('groups').order_by('id')
+    serializer_class = UserSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = UserCursorPagination
+
+
+def date_param(request, name, required=False):
+    """The ``?name=YYYY-MM-DD`` date, or None when it isn't given and not ``required``."""
+    value = request.query_params.get(name, '')
+    if not value and not required:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        # Well formed but impossible, like 2030-02-30.
+        day = None
+    if day is None:
+        raise ValidationError({name: ['Expected a date as YYYY-MM-DD.']})
+    return day
+
+
+class TableAvailabilityView(LocationMixin, APIView):
+    """Free tables per seating time for ``?date=YYYY-MM-DD``."""
+
+    def get(self, request):
+        day = date_param(request, 'date', required=True)
+        try:
+            return Response(availability(day, self.get_location()))
+        except OverflowError:
+            # So close to date.min or date.max that the seatings run off it.
+            raise ValidationError({'date': ['Date out of range.']})
+
+
+class ExportMixin:
+    """
+    Stream the rows as ``?output=csv`` (default) or ``?output=ndjson``,
+    gzipped when the client accepts it or asks with ``?gzip=1``. Views
+    using it set ``fields`` and ``filename`` and define ``get_queryset``.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in exports.FORMATS:
+            raise ValidationError({'output': [f"Expected one of {', '.join(exports.FORMATS)}."]})
+        lines = exports.export_lines(self.get_queryset(), self.fields, fmt)
+        compress = (
+            request.query_params.get('gzip') == '1'
+            or exports.accepts_gzip(request.headers.get('Accept-Encoding', ''))
+        )
+        if compress:
+            response = StreamingHttpResponse(
+                compress_sequence(line.encode() for line in lines),
+                content_type=exports.FORMATS[fmt],
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(lines, content_type=exports.FORMATS[fmt])
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{fmt}"'
+        return response
+
+
+class BookingExportView(ExportMixin, LocationMixin, APIView):
+    fields = exports.BOOKING_FIELDS
+    filename = 'bookings'
+
+    def get_queryset(self):
+        since = date_param(self.request, 'since')
+        until = date_param(self.request, 'until')
+        return exports.booking_queryset(self.get_location(), since, until)
+
+
+class MenuExportView(ExportMixin, LocationMixin, APIView):
+    fields = exports.MENU_FIELDS
+    filename = 'menu'
+
+    def get_queryset(self):
+        return exports.menu_queryset(self.get_location())
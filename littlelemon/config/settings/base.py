@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,10 +39,12 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'apps.restaurant',
 ]
 
 MIDDLEWARE = [
+    'apps.restaurant.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,13 +52,69 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.restaurant.timing.ServerTimingViewMiddleware',
 ]
 
+# Requests for these routes skip the SKIP middleware (see
+# apps.restaurant.dispatch): the token-authenticated API reads no session,
+# messages or CSRF cookie. Routes are path PREFIXES (matching the path and
+# every path below it, so only for trees that are entirely stateless) or
+# URL_NAMES (matching those routes only). The menu is listed by name:
+# /restaurant/menu/export is staff-only and used from the browser, with a
+# session. X-Frame-Options stays, as the browsable API renders HTML.
+STATELESS_ROUTES = {
+    'PREFIXES': ['/restaurant/booking/tables'],
+    'URL_NAMES': ['menu-list', 'menu-detail', 'table-availability'],
+    'SKIP': [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    ],
+}
+
+# Report per-phase timings in a Server-Timing header and the
+# apps.restaurant.timing logger. On in config.settings.dev only: the header
+# would tell any client how long each request spends in the database.
+SERVER_TIMING = False
+
+# Workers started with LITTLELEMON_WORKER_ROLE=api only serve the DRF
+# endpoints, so they skip the admin and messages framework at boot.
+WORKER_ROLE = os.environ.get('LITTLELEMON_WORKER_ROLE', 'web')
+
+if WORKER_ROLE == 'api':
+    INSTALLED_APPS.remove('django.contrib.admin')
+    INSTALLED_APPS.remove('django.contrib.messages')
+    MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
+
+# Milliseconds a cold import of config.wsgi may take, checked by
+# `manage.py profile_startup`. A web worker currently boots in 300-450 ms,
+# best of several runs, depending on the machine. DRF's serializers and
+# renderers are kept out of the boot: they load with the first API request.
+STARTUP_BUDGET_MS = 500
+
+# `manage.py serve`: the master loads and warms the application once
+# (compiling WARM_TEMPLATES and requesting WARM_URLS), then forks WORKERS
+# processes sharing its memory. A worker is replaced after MAX_REQUESTS
+# requests plus up to MAX_REQUESTS_JITTER; stopping workers get
+# GRACEFUL_TIMEOUT seconds to finish their request. A connection that sends
+# or reads nothing for TIMEOUT seconds is closed.
+SERVE = {
+    'BIND': '127.0.0.1:8000',
+    'WORKERS': 4,
+    'MAX_REQUESTS': 10000,
+    'MAX_REQUESTS_JITTER': 1000,
+    'GRACEFUL_TIMEOUT': 30,
+    'TIMEOUT': 30,
+    'WARM_TEMPLATES': ['restaurant/home.html', 'rest_framework/api.html'],
+    'WARM_URLS': ['/restaurant/menu'],
+}
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'apps.restaurant.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,6 +129,40 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.restaurant.renderers.TimedJSONRenderer',
+        'apps.restaurant.renderers.TimedBrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        # First, so unauthenticated API calls get a 401 asking for a token.
+        'apps.restaurant.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+}
+
+# Token authentication (apps.restaurant.authentication): each worker keeps
+# up to CACHE_SIZE resolved tokens for TTL seconds and checks the shared
+# auth epoch every EPOCH_CHECK seconds, so logout and token rotation reach
+# all workers within EPOCH_CHECK seconds. Signed tokens expire after
+# SIGNED_MAX_AGE seconds.
+TOKEN_AUTH = {
+    'CACHE_SIZE': 10000,
+    'TTL': 300,
+    'EPOCH_CHECK': 2,
+    'SIGNED_MAX_AGE': 30 * 24 * 3600,
+}
+
+# The menu endpoints read from a per-worker snapshot of the menu
+# (apps.restaurant.menu_cache). Workers check the shared menu epoch every
+# EPOCH_CHECK seconds, so a menu change reaches all of them within
+# EPOCH_CHECK seconds. The PRELOAD locations are loaded before a worker's
+# first request, the others when first read.
+MENU_CACHE = {
+    'EPOCH_CHECK': 2,
+    'PRELOAD': ['main'],
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -85,6 +178,64 @@ DATABASES = {
     }
 }
 
+# Locations and the database holding each one's menu, tables and bookings
+# (see apps.restaurant.sharding). Several locations can share a database;
+# move one with `manage.py move_location`.
+LOCATION_SHARDS = {
+    'main': 'default',
+}
+DEFAULT_LOCATION = 'main'
+
+DATABASE_ROUTERS = ['apps.restaurant.sharding.LocationRouter']
+
+# Sessions are stored in the database. Once CACHES has a cache shared by all
+# workers (SESSION_CACHE_ALIAS), set SESSION_ENGINE = 'apps.restaurant.sessions':
+# sessions are then read through the cache, unchanged sessions are not
+# written back, and changes reach the database at most every
+# SESSION_FLUSH_INTERVAL seconds. It refuses to start on the default
+# per-process cache.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_FLUSH_INTERVAL = 30
+
+
+# Table allocation (apps.restaurant.allocation): a booking holds its table
+# for DURATION_MINUTES, and availability is reported every
+# INTERVAL_MINUTES between OPENS and CLOSES (the last seating). Each worker
+# keeps the seating of up to CACHED_DAYS location-days in memory.
+SEATING = {
+    'OPENS': '17:00',
+    'CLOSES': '22:00',
+    'INTERVAL_MINUTES': 30,
+    'DURATION_MINUTES': 120,
+    'CACHED_DAYS': 1000,
+}
+
+# Background jobs (apps.restaurant.jobs), run by `manage.py run_jobs`.
+# Failed jobs are retried after RETRY_BASE * 2**(attempt - 1) seconds, up
+# to RETRY_MAX, and are marked dead after MAX_ATTEMPTS.
+JOB_QUEUE = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE': 30,
+    'RETRY_MAX': 3600,
+    # Running jobs not updated for this many seconds (run_jobs updates its
+    # jobs every third of it) are requeued, or marked dead if that was
+    # their last attempt.
+    'STALE_AFTER': 600,
+}
+
+# Idempotency-Key handling for booking POSTs (apps.restaurant.idempotency).
+IDEMPOTENCY = {
+    # DatabaseStore or CacheStore; the cache store needs a cache shared by
+    # all workers.
+    'STORE': 'apps.restaurant.idempotency.DatabaseStore',
+    # Seconds a response is replayed for.
+    'TTL': 24 * 60 * 60,
+    # Seconds before the lock of a request that never finished expires.
+    'LOCK_TIMEOUT': 30,
+    # Seconds a duplicate waits for the first request before a 409.
+    'WAIT': 5,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,3 +277,19 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.restaurant.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
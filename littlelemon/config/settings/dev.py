@@ -1,3 +1,5 @@
 from .base import *
 
-DEBUG = True
\ No newline at end of file
+DEBUG = True
+
+SERVER_TIMING = True
@@ -1,3 +1,30 @@
+import os
+
 from .base import *
 
-DEBUG = False
\ No newline at end of file
+DEBUG = False
+
+# Keep compiled templates in memory instead of re-reading them per render.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Request profiling (apps.restaurant.middleware.ProfilingMiddleware). Off by
+# default; when off the middleware drops out of the stack at startup.
+PROFILING = {
+    'ENABLED': os.environ.get('LITTLELEMON_PROFILING') == '1',
+    # Fraction of requests to profile; requests sending a matching
+    # X-Profile-Token header are always profiled.
+    'SAMPLE_RATE': 0.01,
+    'TOKEN': os.environ.get('LITTLELEMON_PROFILING_TOKEN', ''),
+    # 'sample' writes folded stacks, 'cprofile' writes pstats files.
+    'MODE': 'sample',
+    'INTERVAL': 0.005,
+    'DIR': BASE_DIR.parent / 'profiles',
+    'MAX_FILES': 100,
+}
+
+MIDDLEWARE.insert(0, 'apps.restaurant.middleware.ProfilingMiddleware')
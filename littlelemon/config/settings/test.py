@@ -0,0 +1,29 @@
+from .base import *
+
+# Three local SQLite files standing in for three MySQL shards, so routing,
+# fan-out and `move_location` can be tested without a database server:
+#   python manage.py test --settings=config.settings.test
+DATABASES = {
+    alias: {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR.parent / f'{alias}.sqlite3',
+        'TEST': {'NAME': BASE_DIR.parent / f'test_{alias}.sqlite3'},
+    }
+    for alias in ('default', 'shard_east', 'shard_west')
+}
+
+LOCATION_SHARDS = {
+    'main': 'default',
+    'harbour': 'shard_east',
+    'old_town': 'shard_east',
+    'uptown': 'shard_west',
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Tests load the menus they read; a preload would query the default shard
+# from whichever test sends the first request.
+MENU_CACHE = {**MENU_CACHE, 'PRELOAD': []}
+
+# Tests that turn SERVER_TIMING on don't print a line per request.
+LOGGING['loggers']['apps.restaurant.timing']['level'] = 'WARNING'
@@ -14,16 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from restaurant.views import BookingViewSet
+from apps.restaurant.views import BookingViewSet
 
 router = DefaultRouter()
 router.register(r'tables', BookingViewSet)
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('restaurant/', include('apps.restaurant.urls')),
     path('restaurant/booking/', include(router.urls)),
 ]
+
+# API-only workers run without the admin (see WORKER_ROLE in settings).
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -9,8 +9,9 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from apps.restaurant.dispatch import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.prod')
 
+# Routes in STATELESS_ROUTES run a shorter middleware stack.
 application = get_wsgi_application()